@@ -0,0 +1,145 @@
+"""
+Кэш готовых выгрузок шаблонов (xlsx/pdf).
+Ключ содержит версию шаблона, поэтому устаревшие записи никогда не
+отдаются и просто вытесняются по LRU. Есть два уровня: ограниченный по
+размеру кэш в памяти воркера и необязательный каталог на диске, который
+переживает перезапуск воркеров Gunicorn по max_requests.
+"""
+from collections import OrderedDict
+from typing import Optional
+import io
+import os
+import shutil
+import tempfile
+import threading
+import sys
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+
+def export_cache_key(template, export_format: str) -> str:
+    """
+    Ключ выгрузки: id шаблона, время создания (id может быть переиспользован
+    после удаления шаблона), версия содержимого и формат.
+    """
+    created = template.created_at.strftime('%Y%m%d%H%M%S%f') if template.created_at else '0'
+    return f"{template.id}-{created}-{template.version}.{export_format}"
+
+class ExportCache:
+    def __init__(self, max_bytes: int, disk_dir: str = "", disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        # Один файл не должен вытеснять весь кэш в памяти
+        self.max_item_bytes = max_bytes // 4
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key: str):
+        """Открытый файл с выгрузкой или None, если ее нет в кэше"""
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                return io.BytesIO(data)
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            fileobj = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        # Отмечаем использование для LRU на диске. Файл мог быть вытеснен
+        # другим воркером после open(): открытый файл все равно читается
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        size = os.fstat(fileobj.fileno()).st_size
+        if size <= self.max_item_bytes:
+            data = fileobj.read()
+            fileobj.close()
+            self._remember(key, data)
+            return io.BytesIO(data)
+        return fileobj
+
+    def store(self, key: str, path: str):
+        """
+        Кладет готовый файл в кэш и возвращает его открытым для отправки.
+        Кэш забирает файл: он переносится в каталог кэша или удаляется.
+        """
+        size = os.path.getsize(path)
+        if size <= self.max_item_bytes:
+            with open(path, "rb") as fileobj:
+                self._remember(key, fileobj.read())
+        disk_path = self._disk_path(key)
+        if disk_path is None:
+            fileobj = open(path, "rb")
+            os.unlink(path)
+            return fileobj
+        self._drop_other_versions(key)
+        # Переносим атомарно, чтобы другие воркеры не прочитали недописанный файл
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        os.close(fd)
+        shutil.move(path, tmp_path)
+        os.replace(tmp_path, disk_path)
+        self._evict_disk()
+        return open(disk_path, "rb")
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, key)
+
+    def _drop_other_versions(self, key: str):
+        """Удаляет с диска прошлые версии той же выгрузки"""
+        template_part, _, rest = key.rpartition("-")
+        export_format = rest.rpartition(".")[2]
+        for name in os.listdir(self.disk_dir):
+            if name != key and name.startswith(template_part + "-") and name.endswith("." + export_format):
+                try:
+                    os.unlink(os.path.join(self.disk_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+export_cache = ExportCache(
+    max_bytes=settings.EXPORT_CACHE_MAX_BYTES,
+    disk_dir=settings.EXPORT_CACHE_DIR,
+    disk_max_bytes=settings.EXPORT_CACHE_DISK_MAX_BYTES
+)
@@ -0,0 +1,228 @@
+"""
+Календарные подписки (iCalendar) на расписание группы, преподавателя или кабинета.
+Календарные приложения опрашивают ленту каждые несколько минут, поэтому
+ETag и Last-Modified считаются только по таблицам schedule_templates
+(версии шаблонов) и table_versions (время изменения списка шаблонов), а
+таблица schedules читается лишь при изменениях.
+Еженедельное занятие выводится одним событием с RRULE, а даты, на которые
+у группы есть занятие на конкретную дату (см. recurrence.py), — как EXDATE.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import sys
+import os
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate, TableVersion
+from app.api.http_cache import make_etag, validator_headers, is_not_modified, not_modified_response
+from app.api.recurrence import override_slots
+
+CALENDAR_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+def _lesson_times() -> dict:
+    """Номер пары -> (начало, конец) из настройки LESSON_TIMES"""
+    times = {}
+    for number, span in enumerate(settings.LESSON_TIMES.split(","), start=1):
+        start, end = span.strip().split("-")
+        times[number] = (time.fromisoformat(start), time.fromisoformat(end))
+    return times
+
+LESSON_TIMES = _lesson_times()
+
+def _feed_cutoff() -> date:
+    return date.today() - timedelta(days=settings.CALENDAR_PAST_DAYS)
+
+def feed_templates(db: Session, group_type: Optional[str] = None):
+    """Шаблоны, попадающие в ленту: еще не закончившиеся или недавно закончившиеся"""
+    query = db.query(
+        ScheduleTemplate.id, ScheduleTemplate.version, ScheduleTemplate.updated_at, ScheduleTemplate.created_at
+    ).filter(ScheduleTemplate.date_end >= _feed_cutoff())
+    if group_type is not None:
+        query = query.filter(ScheduleTemplate.group_type == group_type)
+    return query.order_by(ScheduleTemplate.id).all()
+
+def feed_last_modified(db: Session, templates, group_type: Optional[str] = None) -> Optional[datetime]:
+    """
+    Last-Modified ленты: растет вместе с ETag. Кроме изменения шаблонов ленты
+    учитываются создание и удаление шаблонов (время версии schedule_templates
+    в table_versions) и выход последнего шаблона из ленты по CALENDAR_PAST_DAYS.
+    """
+    moments = [t.updated_at or t.created_at for t in templates if t.updated_at or t.created_at]
+    moments.append(db.query(TableVersion.updated_at).filter(TableVersion.name == "schedule_templates").scalar())
+    left = db.query(func.max(ScheduleTemplate.date_end)).filter(ScheduleTemplate.date_end < _feed_cutoff())
+    if group_type is not None:
+        left = left.filter(ScheduleTemplate.group_type == group_type)
+    left = left.scalar()
+    if left is not None:
+        moments.append(datetime.combine(left + timedelta(days=settings.CALENDAR_PAST_DAYS + 1), time()))
+    return max((moment for moment in moments if moment is not None), default=None)
+
+def feed_rows(db: Session, column, entity_id: int, template_ids):
+    """Занятия ленты одним запросом с названиями и параметрами шаблона"""
+    return db.query(
+        Schedule.id,
+        Schedule.date,
+        Schedule.day_of_week,
+        Schedule.lesson_number,
+        Schedule.is_above_line,
+        Schedule.lesson_type,
+        Lessons.name,
+        Teachers.name,
+        Groups.name,
+        Rooms.number,
+        ScheduleTemplate.is_full_semester,
+        ScheduleTemplate.date_start,
+        ScheduleTemplate.date_end,
+        Schedule.group_id
+    ).join(
+        Lessons, Schedule.lesson_id == Lessons.id
+    ).join(
+        Teachers, Schedule.teacher_id == Teachers.id
+    ).join(
+        Groups, Schedule.group_id == Groups.id
+    ).join(
+        Rooms, Schedule.room_id == Rooms.id
+    ).join(
+        ScheduleTemplate, Schedule.template_id == ScheduleTemplate.id
+    ).filter(
+        column == entity_id,
+        Schedule.template_id.in_(template_ids)
+    ).order_by(
+        Schedule.date, Schedule.lesson_number
+    ).all()
+
+def feed_exdates(db: Session, rows) -> dict:
+    """id еженедельного занятия -> даты периода шаблона, где его перекрывает занятие группы на дату"""
+    weekly = [row for row in rows if row.is_full_semester and row.day_of_week]
+    if not weekly:
+        return {}
+    slots = override_slots(
+        db, {row.group_id for row in weekly},
+        min(row.date_start for row in weekly), max(row.date_end for row in weekly)
+    )
+    by_cell = defaultdict(list)
+    for group_id, day, lesson_number, is_above_line in slots:
+        by_cell[(group_id, lesson_number, is_above_line)].append(day)
+    exdates = {}
+    for row in weekly:
+        days = sorted(
+            day for day in by_cell.get((row.group_id, row.lesson_number, bool(row.is_above_line)), ())
+            if day.isoweekday() == row.day_of_week and row.date_start <= day <= row.date_end
+        )
+        if days:
+            exdates[row.id] = days
+    return exdates
+
+def _escape(text) -> str:
+    return str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _fold(line: str) -> str:
+    """Перенос строк длиннее 75 октетов (RFC 5545, 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Не разрываем многобайтовый символ UTF-8
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+def _format_dt(day: date, moment: time) -> str:
+    return datetime.combine(day, moment).strftime("%Y%m%dT%H%M%S")
+
+def _event_lines(row, dtstamp: str, exdates=()) -> list:
+    (schedule_id, day, day_of_week, lesson_number, is_above_line, lesson_type,
+     lesson_name, teacher_name, group_name, room_number,
+     is_full_semester, template_start, template_end, _) = row
+    rrule = None
+    if is_full_semester and day_of_week:
+        # Еженедельное занятие: первое вхождение дня недели в период шаблона
+        day = template_start + timedelta(days=(day_of_week - template_start.isoweekday()) % 7)
+        if day > template_end:
+            return []
+        rrule = f"RRULE:FREQ=WEEKLY;UNTIL={template_end.strftime('%Y%m%d')}T235959"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:schedule-{schedule_id}@apischedule",
+        f"DTSTAMP:{dtstamp}",
+    ]
+    if lesson_number in LESSON_TIMES:
+        start, end = LESSON_TIMES[lesson_number]
+        lines.append(f"DTSTART:{_format_dt(day, start)}")
+        lines.append(f"DTEND:{_format_dt(day, end)}")
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}")
+    if rrule:
+        lines.append(rrule)
+        if exdates and lesson_number in LESSON_TIMES:
+            lines.append("EXDATE:" + ",".join(_format_dt(exdate, start) for exdate in exdates))
+        elif exdates:
+            lines.append("EXDATE;VALUE=DATE:" + ",".join(exdate.strftime('%Y%m%d') for exdate in exdates))
+    line_label = "Над чертой" if is_above_line else "Под чертой"
+    description = f"{lesson_number} пара, {line_label}\nПреподаватель: {teacher_name}\nГруппа: {group_name}"
+    if lesson_type:
+        description += f"\nТип занятия: {lesson_type}"
+    lines += [
+        f"SUMMARY:{_escape(lesson_name)}",
+        f"LOCATION:{_escape('Ауд. ' + str(room_number))}",
+        f"DESCRIPTION:{_escape(description)}",
+        "END:VEVENT",
+    ]
+    return lines
+
+def build_calendar(name: str, rows, last_modified: Optional[datetime], exdates: Optional[dict] = None) -> str:
+    # DTSTAMP берется из версии данных, чтобы при одинаковом ETag тело не менялось
+    dtstamp = (last_modified or datetime(1970, 1, 1)).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ApiSchedule//Schedule//RU",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ]
+    exdates = exdates or {}
+    for row in rows:
+        lines += _event_lines(row, dtstamp, exdates.get(row[0], ()))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+def calendar_response(
+    request: Request,
+    db: Session,
+    column,
+    entity_id: int,
+    name: str,
+    group_type: Optional[str] = None
+) -> Response:
+    """
+    Лента .ics для занятий, где column == entity_id.
+    Если валидаторы клиента совпадают, отвечает 304 без запроса к schedules.
+    """
+    templates = feed_templates(db, group_type)
+    last_modified = feed_last_modified(db, templates, group_type)
+    etag = make_etag(
+        "ics", column.key, entity_id, name, settings.LESSON_TIMES,
+        ";".join(f"{t.id}:{t.version}" for t in templates)
+    )
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    rows = feed_rows(db, column, entity_id, [t.id for t in templates]) if templates else []
+    return Response(
+        content=build_calendar(name, rows, last_modified, feed_exdates(db, rows)),
+        media_type=CALENDAR_MEDIA_TYPE,
+        headers=validator_headers(etag, last_modified)
+    )
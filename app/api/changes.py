@@ -0,0 +1,197 @@
+"""
+Журнал изменений расписания и справочников для клиентов, которые
+подтягивают только изменения (/api/changes?since=N) вместо полной перезагрузки.
+Записи ORM (add, изменение полей, delete) попадают в журнал сами через
+событие after_flush сессии; пакетные операции одним SQL (вставка
+пачки занятий, копирование и удаление шаблона) записываются явно через
+record_changes до db.commit().
+Номера выдаются счетчиком change_log в table_versions: его строка
+блокируется UPDATE до конца транзакции, поэтому номера идут в порядке
+commit и клиент, запомнивший последний номер, не пропустит изменения.
+Сжатие оставляет по каждой сущности только последнюю запись и удаляет
+записи старше CHANGE_LOG_RETENTION_DAYS; клиенту с since ниже удаленных
+номеров (change_log_horizon) нужно перезагрузить данные целиком.
+Сжатие удаляет записи по всему журналу, поэтому идет не в запросах, а
+фоновой задачей воркера (compact_periodically) или скриптом
+compact_changes.py из cron.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import sys
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from sqlalchemy import event, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session, Query, aliased
+from sqlalchemy.sql import Select
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from app.api.database import SessionLocal
+from app.api.models import Groups, Teachers, Lessons, Rooms, Schedule, ScheduleTemplate, ChangeLog, TableVersion
+from app.api.pagination import page_limit
+
+TRACKED_MODELS = {
+    model.__tablename__: model
+    for model in (Schedule, ScheduleTemplate, Groups, Teachers, Lessons, Rooms)
+}
+SEQUENCE = "change_log"
+HORIZON = "change_log_horizon"
+
+logger = logging.getLogger(__name__)
+
+def _counter(connection, name: str) -> int:
+    return connection.execute(select(TableVersion.version).where(TableVersion.name == name)).scalar() or 0
+
+def _allocate(connection, count: int) -> int:
+    """Резервирует count номеров и возвращает первый"""
+    updated = connection.execute(
+        update(TableVersion).where(TableVersion.name == SEQUENCE).values(version=TableVersion.version + count)
+    )
+    if not updated.rowcount:
+        # Строки еще нет (база создана через create_all, а не миграцией)
+        connection.execute(insert(TableVersion).values(name=SEQUENCE, version=count))
+    return _counter(connection, SEQUENCE) - count + 1
+
+def _append(connection, changes):
+    first = _allocate(connection, len(changes))
+    now = datetime.utcnow()
+    connection.execute(insert(ChangeLog), [
+        {"seq": first + offset, "table_name": table, "entity_id": entity_id, "action": action, "created_at": now}
+        for offset, (table, entity_id, action) in enumerate(changes)
+    ])
+
+def _record_flush(session: Session, flush_context):
+    changes = []
+    for action, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in TRACKED_MODELS:
+                continue
+            if action == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            changes.append((table, obj.id, action))
+    if changes:
+        _append(session.connection(), changes)
+
+event.listen(SessionLocal, "after_flush", _record_flush)
+
+def record_changes(db: Session, table: str, action: str, ids):
+    """
+    Изменения, сделанные в обход ORM. ids — список id или запрос одной
+    колонки id; во втором случае записи добавляются одним INSERT ... SELECT.
+    """
+    connection = db.connection()
+    if isinstance(ids, Query):
+        ids = ids.statement
+    if not isinstance(ids, Select):
+        if ids:
+            _append(connection, [(table, entity_id, action) for entity_id in ids])
+        return
+    source = ids.subquery()
+    count = connection.execute(select(func.count()).select_from(source)).scalar()
+    if not count:
+        return
+    first = _allocate(connection, count)
+    entity_id = list(source.c)[0]
+    rows = select(
+        literal(first - 1) + func.row_number().over(order_by=entity_id),
+        literal(table), entity_id, literal(action), literal(datetime.utcnow())
+    )
+    connection.execute(insert(ChangeLog).from_select(
+        ["seq", "table_name", "entity_id", "action", "created_at"], rows
+    ))
+
+def _entity_data(obj) -> dict:
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+def changes_since(db: Session, since: int, limit: Optional[int] = None) -> dict:
+    """
+    Изменения с номерами больше since: по каждой сущности последнее действие
+    и, кроме удаления, ее текущие поля. last_seq — since для следующего запроса.
+    """
+    limit = page_limit(limit)
+    last_seq = _counter(db, SEQUENCE)
+    if since < _counter(db, HORIZON) or since > last_seq:
+        # Часть журнала уже сжата (или база пересоздана): нужна полная перезагрузка
+        return {"reset": True, "last_seq": last_seq, "has_more": False, "changes": []}
+    rows = db.query(
+        ChangeLog.seq, ChangeLog.table_name, ChangeLog.entity_id, ChangeLog.action
+    ).filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        latest.pop((row.table_name, row.entity_id), None)
+        latest[(row.table_name, row.entity_id)] = row
+    wanted = {}
+    for (table, entity_id), row in latest.items():
+        if row.action != "delete":
+            wanted.setdefault(table, []).append(entity_id)
+    current = {}
+    for table, ids in wanted.items():
+        model = TRACKED_MODELS[table]
+        for obj in db.query(model).filter(model.id.in_(ids)):
+            current[(table, obj.id)] = _entity_data(obj)
+
+    changes = []
+    for key, row in latest.items():
+        data = current.get(key)
+        changes.append({
+            "seq": row.seq,
+            "table": row.table_name,
+            "id": row.entity_id,
+            # Сущность удалена позже, чем закончилась эта страница
+            "action": row.action if data is not None or row.action == "delete" else "delete",
+            "data": data
+        })
+    return {
+        "reset": False,
+        "last_seq": rows[-1].seq if rows else since,
+        "has_more": has_more,
+        "changes": changes
+    }
+
+def compact_changes(db: Session) -> dict:
+    """Удаляет вытесненные и устаревшие записи журнала"""
+    later = aliased(ChangeLog)
+    superseded = db.query(ChangeLog).filter(exists().where(
+        later.table_name == ChangeLog.table_name,
+        later.entity_id == ChangeLog.entity_id,
+        later.seq > ChangeLog.seq
+    )).delete(synchronize_session=False)
+    cutoff = datetime.utcnow() - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS)
+    horizon = db.query(func.max(ChangeLog.seq)).filter(ChangeLog.created_at < cutoff).scalar()
+    expired = 0
+    if horizon is not None:
+        expired = db.query(ChangeLog).filter(ChangeLog.seq <= horizon).delete(synchronize_session=False)
+        updated = db.query(TableVersion).filter(
+            TableVersion.name == HORIZON, TableVersion.version < horizon
+        ).update({TableVersion.version: horizon}, synchronize_session=False)
+        if not updated and not db.query(TableVersion.name).filter(TableVersion.name == HORIZON).first():
+            db.add(TableVersion(name=HORIZON, version=horizon))
+    db.commit()
+    return {"superseded": superseded, "expired": expired}
+
+def compact_changes_once() -> dict:
+    """Сжатие в отдельной сессии (фоновая задача, скрипт для cron)"""
+    db = SessionLocal()
+    try:
+        return compact_changes(db)
+    finally:
+        db.close()
+
+async def compact_periodically():
+    """Фоновая задача воркера: сжатие раз в CHANGE_LOG_COMPACT_INTERVAL секунд"""
+    while True:
+        await asyncio.sleep(settings.CHANGE_LOG_COMPACT_INTERVAL)
+        try:
+            await run_in_threadpool(compact_changes_once)
+        except Exception:
+            logger.exception("Не удалось сжать журнал изменений")
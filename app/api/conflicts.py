@@ -0,0 +1,202 @@
+"""
+Поиск накладок: преподаватель или кабинет заняты двумя занятиями в одной
+ячейке (день, пара, над/под чертой).
+Занятие обычного шаблона занимает конкретную дату, занятие расписания на
+весь семестр — день недели в пределах периода своего шаблона. Занятия
+раскладываются по корзинам (ресурс, день, пара, черта), и сравниваются
+только занятия внутри одной корзины, поэтому проверка шаблона идет почти
+за линейное время. Одинаковые преподаватель, кабинет и предмет в одной
+ячейке считаются потоковым занятием нескольких групп, а не накладкой.
+Строка шаблона на весь семестр без day_of_week — занятие на дату, и, как
+в recurrence.py, она перекрывает еженедельное занятие своей группы в этой
+ячейке: в такие даты еженедельное занятие ни с чем не сравнивается.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.api.models import Schedule, ScheduleTemplate
+from app.api.recurrence import override_slots
+
+# ref — id занятия в БД или индекс нового занятия в запросе
+SlotEntry = namedtuple("SlotEntry", [
+    "ref", "is_new", "template_id", "group_id", "lesson_id", "teacher_id", "room_id",
+    "date", "day_of_week", "lesson_number", "is_above_line",
+    "is_full_semester", "period_start", "period_end"
+])
+
+def _entries_query(db: Session):
+    return db.query(
+        Schedule.id, Schedule.template_id, Schedule.group_id, Schedule.lesson_id, Schedule.teacher_id,
+        Schedule.room_id, Schedule.date, Schedule.day_of_week, Schedule.lesson_number, Schedule.is_above_line,
+        ScheduleTemplate.is_full_semester, ScheduleTemplate.date_start, ScheduleTemplate.date_end
+    ).join(
+        ScheduleTemplate, Schedule.template_id == ScheduleTemplate.id
+    )
+
+def _load_entries(query) -> list:
+    return [
+        SlotEntry(row[0], False, *row[1:9], bool(row[9]), bool(row[10]), row[11], row[12])
+        for row in query
+    ]
+
+def _describe(entry: SlotEntry) -> dict:
+    described = {
+        "schedule_id": None if entry.is_new else entry.ref,
+        "template_id": entry.template_id,
+        "group_id": entry.group_id,
+        "lesson_id": entry.lesson_id
+    }
+    if entry.is_new:
+        described["index"] = entry.ref
+    return described
+
+def _is_weekly(entry: SlotEntry) -> bool:
+    return entry.is_full_semester and entry.day_of_week is not None
+
+def _overridden(entry: SlotEntry, day: date, overrides) -> bool:
+    return (entry.group_id, day, entry.lesson_number, entry.is_above_line) in overrides
+
+def _common_day(first: SlotEntry, second: SlotEntry, overrides) -> Optional[date]:
+    """Первая дата, когда проводятся оба еженедельных занятия (не перекрыты занятиями на дату)"""
+    last_day = min(first.period_end, second.period_end)
+    day = max(first.period_start, second.period_start)
+    day += timedelta(days=(first.day_of_week - day.isoweekday()) % 7)
+    while day <= last_day:
+        if not _overridden(first, day, overrides) and not _overridden(second, day, overrides):
+            return day
+        day += timedelta(weeks=1)
+    return None
+
+def _weekly_overrides(db: Session, entries, exclude_ids=()) -> set:
+    """Занятия на дату, перекрывающие еженедельные занятия из entries (в том числе других преподавателей)"""
+    weekly = [entry for entry in entries if _is_weekly(entry)]
+    if not weekly:
+        return set()
+    return override_slots(
+        db, {entry.group_id for entry in weekly},
+        min(entry.period_start for entry in weekly), max(entry.period_end for entry in weekly),
+        exclude_ids
+    )
+
+def find_conflicts(entries, focus=None, overrides=()) -> list:
+    """
+    Накладки среди entries. focus(entry) ограничивает результат парами,
+    где хотя бы одно занятие ему удовлетворяет. overrides — ячейки
+    (группа, дата, пара, черта) занятий на дату, не вошедших в entries.
+    """
+    dated = defaultdict(list)
+    weekly = defaultdict(list)
+    overrides = set(overrides)
+    for entry in entries:
+        if not _is_weekly(entry) and entry.date is not None:
+            overrides.add((entry.group_id, entry.date, entry.lesson_number, entry.is_above_line))
+        for resource, resource_id in (("teacher", entry.teacher_id), ("room", entry.room_id)):
+            if resource_id is None:
+                continue
+            if _is_weekly(entry):
+                weekly[(resource, resource_id, entry.day_of_week, entry.lesson_number, entry.is_above_line)].append(entry)
+            elif entry.date is not None:
+                dated[(resource, resource_id, entry.date, entry.lesson_number, entry.is_above_line)].append(entry)
+
+    conflicts = []
+    seen = set()
+
+    def clash(resource, resource_id, first, second, day: Optional[date], day_of_week: Optional[int]):
+        if (first.is_new, first.ref) == (second.is_new, second.ref):
+            return
+        if (first.teacher_id, first.room_id, first.lesson_id) == (second.teacher_id, second.room_id, second.lesson_id):
+            return
+        if focus is not None and not (focus(first) or focus(second)):
+            return
+        pair = (resource, day, day_of_week) + tuple(sorted([(first.is_new, first.ref), (second.is_new, second.ref)]))
+        if pair in seen:
+            return
+        seen.add(pair)
+        conflicts.append({
+            "resource": resource,
+            "resource_id": resource_id,
+            "date": day.isoformat() if day else None,
+            "day_of_week": day_of_week,
+            "lesson_number": first.lesson_number,
+            "is_above_line": first.is_above_line,
+            "entries": [_describe(first), _describe(second)]
+        })
+
+    for (resource, resource_id, day, lesson_number, is_above_line), bucket in dated.items():
+        for i, first in enumerate(bucket):
+            for second in bucket[i + 1:]:
+                clash(resource, resource_id, first, second, day, None)
+        # Еженедельные занятия, чей период содержит эту дату и которые в нее не перекрыты
+        for weekly_entry in weekly.get((resource, resource_id, day.isoweekday(), lesson_number, is_above_line), ()):
+            if weekly_entry.period_start <= day <= weekly_entry.period_end and not _overridden(weekly_entry, day, overrides):
+                for first in bucket:
+                    clash(resource, resource_id, first, weekly_entry, day, None)
+
+    for (resource, resource_id, day_of_week, _, _), bucket in weekly.items():
+        for i, first in enumerate(bucket):
+            for second in bucket[i + 1:]:
+                if _common_day(first, second, overrides) is not None:
+                    clash(resource, resource_id, first, second, None, day_of_week)
+    return conflicts
+
+def template_conflicts(db: Session, template) -> list:
+    """Накладки с участием занятий шаблона, в том числе с пересекающимися шаблонами"""
+    teacher_ids = select(Schedule.teacher_id).where(Schedule.template_id == template.id)
+    room_ids = select(Schedule.room_id).where(Schedule.template_id == template.id)
+    entries = _load_entries(_entries_query(db).filter(
+        ScheduleTemplate.date_start <= template.date_end,
+        ScheduleTemplate.date_end >= template.date_start,
+        or_(Schedule.teacher_id.in_(teacher_ids), Schedule.room_id.in_(room_ids))
+    ))
+    return find_conflicts(
+        entries, focus=lambda entry: entry.template_id == template.id, overrides=_weekly_overrides(db, entries)
+    )
+
+def check_conflicts(db: Session, items, exclude_ids=()) -> list:
+    """
+    Проверка перед записью: накладки новых занятий (схемы ScheduleCreate)
+    с существующими и между собой. exclude_ids — изменяемые занятия.
+    """
+    templates = {
+        row.id: row
+        for row in db.query(
+            ScheduleTemplate.id, ScheduleTemplate.is_full_semester, ScheduleTemplate.date_start, ScheduleTemplate.date_end
+        ).filter(ScheduleTemplate.id.in_({item.template_id for item in items}))
+    }
+    if not templates:
+        return []
+    candidates = []
+    for index, item in enumerate(items):
+        template = templates.get(item.template_id)
+        if template is None:
+            continue
+        candidates.append(SlotEntry(
+            index, True, item.template_id, item.group_id, item.lesson_id, item.teacher_id, item.room_id,
+            item.date, item.day_of_week, item.lesson_number, bool(item.is_above_line),
+            bool(template.is_full_semester), template.date_start, template.date_end
+        ))
+    query = _entries_query(db).filter(
+        ScheduleTemplate.date_start <= max(t.date_end for t in templates.values()),
+        ScheduleTemplate.date_end >= min(t.date_start for t in templates.values()),
+        or_(
+            Schedule.teacher_id.in_({item.teacher_id for item in items}),
+            Schedule.room_id.in_({item.room_id for item in items})
+        ),
+        Schedule.lesson_number.in_({item.lesson_number for item in items})
+    )
+    if not any(_is_weekly(candidate) for candidate in candidates):
+        # Занятиям на даты мешают только занятия тех же дат и еженедельные
+        query = query.filter(or_(
+            Schedule.date.in_({candidate.date for candidate in candidates}),
+            ScheduleTemplate.is_full_semester.is_(True)
+        ))
+    if exclude_ids:
+        query = query.filter(Schedule.id.notin_(list(exclude_ids)))
+    entries = candidates + _load_entries(query)
+    return find_conflicts(
+        entries, focus=lambda entry: entry.is_new, overrides=_weekly_overrides(db, entries, exclude_ids)
+    )
@@ -0,0 +1,80 @@
+"""
+Пул процессов для рендеринга выгрузок вне event loop.
+Каждый воркер Gunicorn создает свой пул при первом экспорте и ограничивает
+число одновременных выгрузок, чтобы остальные запросы не простаивали.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import sys
+import os
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+
+_executor = None
+_in_flight = 0
+
+class ExportBusyError(Exception):
+    """Все слоты экспорта в этом воркере заняты"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Сервер занят подготовкой других выгрузок")
+        self.retry_after = retry_after
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: воркер uvicorn уже запустил потоки, fork из него небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.EXPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+@asynccontextmanager
+async def export_slot():
+    """
+    Занимает слот экспорта на время подготовки выгрузки.
+    Если одновременно уже идет EXPORT_MAX_CONCURRENCY выгрузок, сразу
+    выбрасывает ExportBusyError вместо постановки в очередь.
+    """
+    global _in_flight
+    if _in_flight >= settings.EXPORT_MAX_CONCURRENCY:
+        raise ExportBusyError(settings.EXPORT_RETRY_AFTER)
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+
+@asynccontextmanager
+async def queued_export_slot(poll_interval: float = 0.5):
+    """
+    Как export_slot, но ждет освобождения слота вместо ExportBusyError.
+    Для фоновых задач, которым некуда вернуть 503: они делят тот же
+    лимит EXPORT_MAX_CONCURRENCY с интерактивными выгрузками.
+    """
+    global _in_flight
+    while _in_flight >= settings.EXPORT_MAX_CONCURRENCY:
+        await asyncio.sleep(poll_interval)
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+
+async def run_export(func, *args):
+    """Выполняет func(*args) в пуле процессов и ждет результат, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+def shutdown_executor():
+    """Останавливает пул процессов при завершении воркера"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,323 @@
+"""
+Вспомогательные функции для экспорта расписания в Excel и PDF.
+Модуль не обращается к базе данных: рендеринг работает с простым
+снимком шаблона и выполняется в отдельных процессах (см. executor.py).
+"""
+from collections import namedtuple
+from datetime import timedelta
+import os
+import re
+import tempfile
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from copy import copy
+from functools import lru_cache
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+DAYS_OF_WEEK = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+LESSONS_PER_DAY = 7
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+# Снимок шаблона из простых данных, который можно передать в другой процесс
+ExportTemplate = namedtuple("ExportTemplate", ["id", "name", "group_type", "date_start", "date_end", "is_full_semester"])
+ExportGroup = namedtuple("ExportGroup", ["id", "name"])
+ExportLesson = namedtuple("ExportLesson", [
+    "group_id", "lesson_number", "date", "day_of_week", "is_above_line",
+    "lesson_name", "teacher_name", "room_number"
+])
+ExportSnapshot = namedtuple("ExportSnapshot", ["template", "groups", "lessons"])
+# Подготовленные строки листа для сборки многолистовой книги
+SheetData = namedtuple("SheetData", ["title", "group_count", "rows"])
+
+def build_slot_index(lessons, is_full_semester: bool) -> dict:
+    """
+    Строит индекс занятий шаблона за один проход.
+    Ключ: (group_id, lesson_number, день, is_above_line), где день — это
+    day_of_week для расписания на весь семестр и дата для обычного шаблона.
+    Если в одну ячейку попало несколько занятий, берется первое.
+    """
+    index = {}
+    for lesson in lessons:
+        day_key = lesson.day_of_week if is_full_semester else lesson.date
+        key = (lesson.group_id, lesson.lesson_number, day_key, bool(lesson.is_above_line))
+        index.setdefault(key, lesson)
+    return index
+
+def format_slot(lesson) -> str:
+    """Текст ячейки таблицы для занятия"""
+    if lesson is None:
+        return ''
+    return f"{lesson.lesson_name}\n{lesson.teacher_name}\nАуд. {lesson.room_number}"
+
+def template_days(template) -> list:
+    """Список (подпись дня, ключ дня в индексе занятий) для строк таблицы"""
+    if template.is_full_semester:
+        return [(name, idx + 1) for idx, name in enumerate(DAYS_OF_WEEK)]
+    days = []
+    for i in range((template.date_end - template.date_start).days + 1):
+        day = template.date_start + timedelta(days=i)
+        days.append((f"{day.isoformat()}\n{DAYS_OF_WEEK[i % 6]}", day))
+    return days
+
+def _register_excel_styles(wb) -> dict:
+    """Регистрирует именованные стили ячеек в книге один раз на выгрузку"""
+    thin = Side(border_style="thin", color="000000")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    alignment = Alignment(wrap_text=True, vertical="center", horizontal="center")
+    fill_gray = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+    fill_blue = PatternFill(start_color="E3F0FF", end_color="E3F0FF", fill_type="solid")
+    specs = {
+        "header": (Font(bold=True), PatternFill()),
+        "cell": (copy(DEFAULT_FONT), PatternFill()),
+        "cell_gray": (copy(DEFAULT_FONT), fill_gray),
+        "cell_blue": (copy(DEFAULT_FONT), fill_blue),
+    }
+    names = {}
+    for key, (font, fill) in specs.items():
+        style = NamedStyle(name=f"schedule_{key}", font=font, fill=fill, border=border, alignment=alignment)
+        wb.add_named_style(style)
+        names[key] = style.name
+    return names
+
+def schedule_sheet_rows(template, groups, slots):
+    """
+    Строки листа расписания в виде (значения, стиль); первая строка — шапка.
+    Каждый день занимает LESSONS_PER_DAY пар по две строки: над и под чертой.
+    """
+    yield ["День", "№ пары", "Над чертой/Под чертой"] + [g.name for g in groups], "header"
+    for date_label, day_key in template_days(template):
+        for lesson_num in range(1, LESSONS_PER_DAY + 1):
+            row_nad = [date_label if lesson_num == 1 else "", lesson_num, "Над чертой"]
+            row_pod = ["", "", "Под чертой"]
+            for group in groups:
+                row_nad.append(format_slot(slots.get((group.id, lesson_num, day_key, True))))
+                row_pod.append(format_slot(slots.get((group.id, lesson_num, day_key, False))))
+            # Цвет для "Над чертой" (чередование), "Под чертой" всегда серая
+            yield row_nad, "cell_blue" if lesson_num % 2 == 0 else "cell"
+            yield row_pod, "cell_gray"
+
+def _write_schedule_sheet(ws, styles: dict, group_count: int, rows):
+    """
+    Записывает строки листа построчно. Строки уходят во временный файл
+    openpyxl сразу после формирования, поэтому память не растет с числом
+    дней и групп.
+    """
+    # Ширины колонок и закрепление шапки задаются до записи строк
+    ws.column_dimensions['A'].width = 16
+    ws.column_dimensions['B'].width = 8
+    ws.column_dimensions['C'].width = 16
+    for col in range(4, 4 + group_count):
+        ws.column_dimensions[get_column_letter(col)].width = 28
+    ws.freeze_panes = "A2"
+
+    rows_per_day = 2 * LESSONS_PER_DAY
+    for row_idx, (values, style_key) in enumerate(rows, start=1):
+        if row_idx > 1:
+            ws.row_dimensions[row_idx].height = 45
+            offset = row_idx - 2
+            if offset % rows_per_day == 0:
+                # Объединяем ячейки для даты
+                ws.merged_cells.add(CellRange(min_col=1, min_row=row_idx, max_col=1, max_row=row_idx + rows_per_day - 1))
+            if offset % 2 == 0:
+                # Объединяем ячейки для номера пары
+                ws.merged_cells.add(CellRange(min_col=2, min_row=row_idx, max_col=2, max_row=row_idx + 1))
+        row = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = styles[style_key]
+            row.append(cell)
+        ws.append(row)
+
+def write_schedule_workbook(template, groups, slots, fileobj):
+    """Записывает расписание шаблона в xlsx через write-only книгу"""
+    wb = openpyxl.Workbook(write_only=True)
+    styles = _register_excel_styles(wb)
+    _write_schedule_sheet(wb.create_sheet("Расписание"), styles, len(groups), schedule_sheet_rows(template, groups, slots))
+    wb.save(fileobj)
+
+def sheet_title(template) -> str:
+    """Название листа: тип группы и период, не длиннее 31 символа (ограничение Excel)"""
+    title = f"{template.group_type or 'Unknown'} {template.date_start:%d.%m.%y}-{template.date_end:%d.%m.%y}"
+    return re.sub(r'[\\/*?:\[\]]', '_', title)[:31]
+
+def build_sheet_data(snapshot: ExportSnapshot) -> SheetData:
+    """Готовит строки листа одного шаблона; выполняется в пуле процессов параллельно для разных шаблонов"""
+    slots = build_slot_index(snapshot.lessons, snapshot.template.is_full_semester)
+    return SheetData(
+        title=sheet_title(snapshot.template),
+        group_count=len(snapshot.groups),
+        rows=list(schedule_sheet_rows(snapshot.template, snapshot.groups, slots))
+    )
+
+def render_workbook_file(sheets) -> str:
+    """Собирает подготовленные листы в одну книгу и возвращает путь к файлу"""
+    wb = openpyxl.Workbook(write_only=True)
+    styles = _register_excel_styles(wb)
+    used_titles = set()
+    for sheet in sheets:
+        title = sheet.title
+        suffix = 2
+        while title.lower() in used_titles:
+            title = f"{sheet.title[:26]} ({suffix})"
+            suffix += 1
+        used_titles.add(title.lower())
+        _write_schedule_sheet(wb.create_sheet(title), styles, sheet.group_count, sheet.rows)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    try:
+        with os.fdopen(fd, "wb") as fileobj:
+            wb.save(fileobj)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+def export_filename(template, extension: str) -> str:
+    """Безопасное имя файла выгрузки"""
+    group_type = template.group_type if template.group_type else 'Unknown'
+    date_start = template.date_start.strftime('%Y-%m-%d') if template.date_start else ''
+    date_end = template.date_end.strftime('%Y-%m-%d') if template.date_end else ''
+    file_title = f"Raspisanie_{group_type}_{date_start}_{date_end}.{extension}".replace(' ', '_').replace(':', '')
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', file_title)
+
+# Общие для всех таблиц PDF команды стиля
+PDF_BASE_STYLE = [
+    ('FONTNAME', (0,0), (-1,-1), 'DejaVuSans'),
+    ('FONTSIZE', (0,0), (-1,-1), 7),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+]
+PDF_ROW_HEIGHT = 34
+
+@lru_cache(maxsize=None)
+def _register_pdf_fonts():
+    """Регистрирует шрифты DejaVuSans для кириллицы (один раз на процесс)"""
+    font_path = os.path.join("app", "static", "webfonts", "DejaVuSans.ttf")
+    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
+    bold_font_path = os.path.join("app", "static", "webfonts", "DejaVuSans-Bold.ttf")
+    pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", bold_font_path))
+
+@lru_cache(maxsize=None)
+def _pdf_title_style():
+    style = copy(getSampleStyleSheet()['Title'])
+    style.fontName = 'DejaVuSans'
+    return style
+
+@lru_cache(maxsize=None)
+def _pdf_day_style(first_row: int) -> TableStyle:
+    """
+    Стиль таблицы одного дня: заголовок и LESSONS_PER_DAY пар по две строки.
+    Чередование фона зависит от номера первой строки дня во всем расписании,
+    поэтому стилей всего два и они строятся один раз.
+    """
+    style = TableStyle(PDF_BASE_STYLE)
+    rows = LESSONS_PER_DAY * 2
+    for i in range(1, rows + 1):
+        row = first_row + i - 1
+        if (row % 2) == 0:
+            style.add('BACKGROUND', (0,i), (-1,i), colors.whitesmoke)
+        elif (row % 4) < 2:
+            style.add('BACKGROUND', (0,i), (-1,i), colors.HexColor('#e3f0ff'))
+    style.add('SPAN', (0, 1), (0, rows))  # дата
+    # Объединение ячеек с номером пары
+    for i in range(1, rows + 1, 2):
+        style.add('SPAN', (1, i), (1, i+1))
+    return style
+
+def _vertical_text(s: str) -> str:
+    return '\n'.join(list(s.replace('-', '–')))
+
+def write_schedule_pdf(template, groups, slots, fileobj):
+    """
+    Записывает расписание шаблона в PDF.
+    Каждый день — отдельная таблица со своим заголовком: reportlab раскладывает
+    небольшие таблицы независимо, и время не растет быстрее числа дней.
+    """
+    _register_pdf_fonts()
+    header = ["День", "№ пары", "Над чертой/\nПод чертой"] + [g.name for g in groups]
+    doc = SimpleDocTemplate(fileobj, pagesize=landscape(A4), rightMargin=10, leftMargin=10, topMargin=10, bottomMargin=10)
+    elements = []
+    # Формируем красивый заголовок
+    group_type = template.group_type if template.group_type else 'Unknown'
+    date_start = template.date_start.strftime('%Y-%m-%d') if template.date_start else ''
+    date_end = template.date_end.strftime('%Y-%m-%d') if template.date_end else ''
+    title_text = f"Расписание: {group_type} с {date_start} по {date_end}"
+    elements.append(Paragraph(title_text, _pdf_title_style()))
+    elements.append(Spacer(1, 12))
+    # Растянуть таблицу на всю ширину страницы
+    page_width = landscape(A4)[0] - 20  # минус отступы
+    ncols = len(header)
+    # ширина: день, № пары, группы...
+    # max(): шаблон без групп тоже выгружается, только без колонок групп
+    colWidths = [40, 32, 60] + [(page_width-40-32-60)//max(ncols-3, 1)]*(ncols-3)
+    row_heights = [PDF_ROW_HEIGHT] * (LESSONS_PER_DAY * 2 + 1)
+    first_row = 1
+    for date_label, day_key in template_days(template):
+        # Вертикальный текст для даты и дня недели
+        date_label_vertical = '\n'.join([_vertical_text(part) for part in date_label.split('\n')])
+        data = [header]
+        for lesson_num in range(1, LESSONS_PER_DAY + 1):
+            row_nad = [date_label_vertical if lesson_num == 1 else "", lesson_num, "Над чертой"]
+            row_pod = ["", "", "Под чертой"]
+            for group in groups:
+                # Над чертой
+                row_nad.append(format_slot(slots.get((group.id, lesson_num, day_key, True))))
+                # Под чертой
+                row_pod.append(format_slot(slots.get((group.id, lesson_num, day_key, False))))
+            data.append(row_nad)
+            data.append(row_pod)
+        table = Table(data, repeatRows=1, rowHeights=row_heights, colWidths=colWidths)
+        table.setStyle(_pdf_day_style(first_row % 4))
+        elements.append(table)
+        first_row += LESSONS_PER_DAY * 2
+    doc.build(elements)
+
+EXPORT_WRITERS = {
+    "xlsx": write_schedule_workbook,
+    "pdf": write_schedule_pdf,
+}
+
+def render_export_file(export_format: str, snapshot: ExportSnapshot) -> str:
+    """
+    Рендерит снимок шаблона в файл и возвращает путь к нему.
+    Вызывается в процессе пула экспорта, поэтому принимает и возвращает только
+    простые данные; удалить файл должен вызывающий код.
+    """
+    slots = build_slot_index(snapshot.lessons, snapshot.template.is_full_semester)
+    fd, path = tempfile.mkstemp(suffix=f".{export_format}")
+    try:
+        with os.fdopen(fd, "wb") as fileobj:
+            EXPORT_WRITERS[export_format](snapshot.template, snapshot.groups, slots, fileobj)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+def iter_file_chunks(fileobj, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Отдает содержимое файла кусками для StreamingResponse и закрывает его"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
@@ -0,0 +1,26 @@
+"""
+Быстрый JSON-ответ для больших списков.
+Содержимое — уже готовые dict/list из простых значений: FastAPI не
+прогоняет их через модели pydantic и jsonable_encoder, а байты пишет
+orjson (ставится вместе с fastapi[all]). Без orjson используется json.
+"""
+from datetime import date, datetime
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
@@ -0,0 +1,191 @@
+"""
+Пакетные выгрузки многих шаблонов в один ZIP-архив.
+Состояние задачи хранится в таблице export_jobs, поэтому статус может
+вернуть любой воркер. Архив пишется в общий каталог EXPORT_JOBS_DIR.
+"""
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import sys
+
+from fastapi.concurrency import run_in_threadpool
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from app.api.database import SessionLocal
+from app.api.models import ExportJob, ScheduleTemplate
+from app.api.cache import export_cache, export_cache_key
+from app.api.executor import run_export, queued_export_slot
+from app.api.export import render_export_file, export_filename
+from app.api.snapshots import load_template_snapshots
+
+def _update_job(job_id: str, **fields):
+    """Обновляет задачу в отдельной короткой сессии"""
+    db = SessionLocal()
+    try:
+        db.query(ExportJob).filter(ExportJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _load_job_params(job_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        return json.loads(db.get(ExportJob, job_id).params)
+    finally:
+        db.close()
+
+def _load_job_templates(template_ids):
+    """Шаблоны задачи, отсоединенные от сессии"""
+    db = SessionLocal()
+    try:
+        templates = db.query(ScheduleTemplate).filter(
+            ScheduleTemplate.id.in_(template_ids)
+        ).order_by(ScheduleTemplate.id).all()
+        db.expunge_all()
+        return templates
+    finally:
+        db.close()
+
+def _load_snapshots(templates):
+    db = SessionLocal()
+    try:
+        return {snapshot.template.id: snapshot for snapshot in load_template_snapshots(db, templates)}
+    finally:
+        db.close()
+
+def _copy_cached(key: str, directory: str):
+    """
+    Копирует готовую выгрузку из кэша во временный файл задачи и сразу
+    закрывает ее: кэш может вытеснить запись до записи архива.
+    Возвращает путь к копии или None, если выгрузки нет в кэше.
+    """
+    fileobj = export_cache.get(key)
+    if fileobj is None:
+        return None
+    fd, path = tempfile.mkstemp(dir=directory)
+    with fileobj, os.fdopen(fd, "wb") as dest:
+        shutil.copyfileobj(fileobj, dest)
+    return path
+
+def _write_zip(job_id: str, entries) -> str:
+    """
+    Собирает архив из файлов (имя в архиве, путь) и атомарно кладет его в
+    EXPORT_JOBS_DIR. Файлы открываются по одному во время записи.
+    """
+    os.makedirs(settings.EXPORT_JOBS_DIR, exist_ok=True)
+    path = os.path.join(settings.EXPORT_JOBS_DIR, f"{job_id}.zip")
+    fd, tmp_path = tempfile.mkstemp(dir=settings.EXPORT_JOBS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, zipfile.ZipFile(raw, "w", zipfile.ZIP_DEFLATED) as archive:
+            for arcname, entry_path in entries:
+                with open(entry_path, "rb") as fileobj, archive.open(arcname, "w") as dest:
+                    shutil.copyfileobj(fileobj, dest)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def _store_rendered(rendered: dict):
+    """Отдает отрендеренные файлы кэшу выгрузок (кэш забирает файл себе)"""
+    while rendered:
+        key, path = rendered.popitem()
+        export_cache.store(key, path).close()
+
+def _remove_files(directory: str, rendered: dict):
+    shutil.rmtree(directory, ignore_errors=True)
+    for path in rendered.values():
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+async def run_export_job(job_id: str):
+    """
+    Выполняет задачу: готовые выгрузки берутся из кэша, остальные
+    рендерятся параллельно в пуле процессов экспорта. До записи архива
+    выгрузки лежат во временных файлах, а не в памяти или открытых
+    дескрипторах; при ошибке временные файлы удаляются.
+    """
+    directory = tempfile.mkdtemp(prefix=f"{job_id}-")
+    # key -> путь к отрендеренному файлу, еще не переданному кэшу
+    rendered = {}
+    try:
+        params = await run_in_threadpool(_load_job_params, job_id)
+        await run_in_threadpool(_update_job, job_id, status="running")
+        templates = await run_in_threadpool(_load_job_templates, params["template_ids"])
+        formats = params["formats"]
+
+        tasks = []
+        for template in templates:
+            for export_format in formats:
+                key = export_cache_key(template, export_format)
+                tasks.append((template, export_format, key, await run_in_threadpool(_copy_cached, key, directory)))
+        missing = {template.id: template for template, _, _, path in tasks if path is None}
+        snapshots = await run_in_threadpool(_load_snapshots, list(missing.values()))
+
+        done = len(tasks) - sum(1 for task in tasks if task[3] is None)
+        await run_in_threadpool(_update_job, job_id, completed=done)
+        # Не занимаем весь пул одной задачей: интерактивные выгрузки тоже должны проходить
+        limit = asyncio.Semaphore(settings.EXPORT_WORKERS)
+
+        async def render(template, export_format, key):
+            nonlocal done
+            # Слот общий с интерактивными выгрузками воркера (см. executor.py)
+            async with limit, queued_export_slot():
+                rendered[key] = await run_export(render_export_file, export_format, snapshots[template.id])
+            done += 1
+            await run_in_threadpool(_update_job, job_id, completed=done)
+
+        # Дожидаемся всех рендеров и при ошибке, чтобы удалить уже готовые файлы
+        results = await asyncio.gather(*[
+            render(template, export_format, key)
+            for template, export_format, key, path in tasks if path is None
+        ], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        entries = [
+            (f"{template.id}_{export_filename(template, export_format)}", path or rendered[key])
+            for template, export_format, key, path in tasks
+        ]
+        path = await run_in_threadpool(_write_zip, job_id, entries)
+        await run_in_threadpool(_store_rendered, rendered)
+        await run_in_threadpool(
+            _update_job, job_id, status="done", file_path=path, finished_at=datetime.utcnow()
+        )
+    except Exception as e:
+        await run_in_threadpool(
+            _update_job, job_id, status="failed", error=str(e), finished_at=datetime.utcnow()
+        )
+    finally:
+        await run_in_threadpool(_remove_files, directory, rendered)
+
+def expire_job(db, job: ExportJob):
+    """Задача, оставшаяся в работе дольше EXPORT_JOB_TIMEOUT (например, воркер перезапущен), считается упавшей"""
+    if job.status in ("pending", "running") and job.created_at < datetime.utcnow() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT):
+        job.status = "failed"
+        job.error = "Превышено время выполнения задачи"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+def cleanup_jobs(db):
+    """Удаляет задачи и архивы старше EXPORT_JOB_TTL"""
+    expired = db.query(ExportJob).filter(
+        ExportJob.created_at < datetime.utcnow() - timedelta(seconds=settings.EXPORT_JOB_TTL)
+    ).all()
+    for job in expired:
+        if job.file_path:
+            try:
+                os.unlink(job.file_path)
+            except FileNotFoundError:
+                pass
+        db.delete(job)
+    db.commit()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.api.database import Base
 from datetime import datetime, date
@@ -47,6 +47,9 @@ class ScheduleTemplate(Base):
     description = Column(String, index=True)
     schedule_type = Column(String, default='regular')  # Добавляем тип расписания
     is_full_semester = Column(Boolean, default=False)  # Добавляем флаг для расписания на весь семестр
+    # Версия содержимого: увеличивается при любом изменении шаблона или его занятий
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow)
     
     # Добавляем связь с расписанием
     schedules = relationship("Schedule", back_populates="template")
@@ -66,6 +69,17 @@ class Schedule(Base):
     template_id = Column(Integer, ForeignKey("schedule_templates.id"))
     day_of_week = Column(Integer)  # 1-6 для понедельника-субботы
 
+    # Индексы под запросы расписания: сущность + период, занятия шаблона по сетке
+    __table_args__ = (
+        Index("ix_schedules_group_date", "group_id", "date", "lesson_number"),
+        Index("ix_schedules_teacher_date", "teacher_id", "date", "lesson_number"),
+        Index("ix_schedules_room_date", "room_id", "date", "lesson_number"),
+        Index("ix_schedules_template_day", "template_id", "day_of_week", "lesson_number"),
+        # Ключ keyset-пагинации списков занятий
+        Index("ix_schedules_template_page", "template_id", "date", "lesson_number", "id"),
+        Index("ix_schedules_lesson_id", "lesson_id"),
+    )
+
     # Связи
     group = relationship("Groups", back_populates="schedules")
     lesson = relationship("Lessons", back_populates="schedules")
@@ -105,4 +119,41 @@ class Todo(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     # Связь с пользователем
-    user = relationship("User", back_populates="todos")
\ No newline at end of file
+    user = relationship("User", back_populates="todos")
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    status = Column(String, default="pending")  # pending, running, done, failed
+    params = Column(String)  # JSON: template_ids, formats
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    file_path = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    # Имя таблицы-справочника (groups, teachers, lessons, rooms, schedule_templates)
+    # или счетчика журнала изменений (change_log, change_log_horizon)
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Время последнего увеличения версии (Last-Modified календарных лент)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # Порядковый номер изменения (счетчик change_log в table_versions, см. changes.py)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    table_name = Column(String, nullable=False)  # schedules, schedule_templates, groups, ...
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # create, update, delete
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_change_log_entity", "table_name", "entity_id", "seq"),
+    )
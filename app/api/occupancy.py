@@ -0,0 +1,139 @@
+"""
+Индекс занятости кабинетов для поиска свободных аудиторий.
+Для каждого шаблона в памяти воркера хранится отображение
+(день, номер пары, над чертой) -> {(кабинет, группа): число занятий}
+отдельно для занятий на дату и еженедельных занятий расписания на весь
+семестр (день — day_of_week). Как в recurrence.py, занятие группы на дату
+(из любого шаблона) перекрывает ее еженедельное занятие в той же ячейке,
+и кабинет еженедельного занятия в эту дату считается свободным.
+Актуальность сверяется с schedule_templates.version: шаблон, измененный
+другим воркером, перестраивается одним запросом, а свои изменения
+занятий применяются к индексу на месте (см. apply_change).
+"""
+from datetime import date
+from typing import Optional
+import threading
+
+from sqlalchemy.orm import Session
+
+from app.api.models import Schedule, ScheduleTemplate
+
+def occupancy_entry(schedule) -> tuple:
+    """Запись для apply_change из занятия (модели Schedule или схемы ScheduleCreate)"""
+    return (
+        schedule.template_id, schedule.date, schedule.day_of_week,
+        schedule.lesson_number, schedule.is_above_line, schedule.room_id, schedule.group_id
+    )
+
+class TemplateOccupancy:
+    __slots__ = ("version", "is_full_semester", "dated", "weekly")
+
+    def __init__(self, version: int, is_full_semester: bool):
+        self.version = version
+        self.is_full_semester = is_full_semester
+        self.dated = {}
+        self.weekly = {}
+
+    def add(
+        self, day: date, day_of_week: Optional[int], lesson_number: int, is_above_line, room_id: int,
+        group_id: int, delta: int = 1
+    ):
+        if self.is_full_semester and day_of_week is not None:
+            slots, day_key = self.weekly, day_of_week
+        else:
+            slots, day_key = self.dated, day
+        lessons = slots.setdefault((day_key, lesson_number, bool(is_above_line)), {})
+        count = lessons.get((room_id, group_id), 0) + delta
+        if count > 0:
+            lessons[(room_id, group_id)] = count
+        else:
+            lessons.pop((room_id, group_id), None)
+
+    def lessons(self, day: date, lesson_numbers, lines):
+        """Пары (кабинет, группа) занятий на дату и еженедельных занятий дня недели по ячейкам (пара, черта)"""
+        dated = []
+        weekly = []
+        for lesson_number in lesson_numbers:
+            for is_above_line in lines:
+                cell = (lesson_number, is_above_line)
+                dated += [(cell, lesson) for lesson in self.dated.get((day,) + cell, ())]
+                if self.is_full_semester:
+                    weekly += [(cell, lesson) for lesson in self.weekly.get((day.isoweekday(),) + cell, ())]
+        return dated, weekly
+
+class OccupancyIndex:
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _build(self, db: Session, template_id: int, version: int, is_full_semester: bool) -> TemplateOccupancy:
+        occupancy = TemplateOccupancy(version, bool(is_full_semester))
+        rows = db.query(
+            Schedule.date, Schedule.day_of_week, Schedule.lesson_number, Schedule.is_above_line,
+            Schedule.room_id, Schedule.group_id
+        ).filter(Schedule.template_id == template_id)
+        for row in rows:
+            occupancy.add(*row)
+        return occupancy
+
+    def occupied_rooms(self, db: Session, day: date, lesson_numbers, is_above_line: Optional[bool] = None) -> set:
+        """Кабинеты, занятые на дату day хотя бы в одной из пар lesson_numbers"""
+        templates = db.query(
+            ScheduleTemplate.id, ScheduleTemplate.version, ScheduleTemplate.is_full_semester
+        ).filter(
+            ScheduleTemplate.date_start <= day,
+            ScheduleTemplate.date_end >= day
+        ).all()
+        lines = (True, False) if is_above_line is None else (is_above_line,)
+        dated = []
+        weekly = []
+        for template_id, version, is_full_semester in templates:
+            with self._lock:
+                occupancy = self._templates.get(template_id)
+            if occupancy is None or occupancy.version != version:
+                occupancy = self._build(db, template_id, version, is_full_semester)
+                with self._lock:
+                    self._templates[template_id] = occupancy
+            # Под блокировкой: apply_change может менять слоты из другого потока
+            with self._lock:
+                template_dated, template_weekly = occupancy.lessons(day, lesson_numbers, lines)
+            dated += template_dated
+            weekly += template_weekly
+        # Занятия на дату есть во всех шаблонах этой даты, поэтому перекрытия видны без запроса
+        overrides = {(cell, group_id) for cell, (_, group_id) in dated}
+        result = {room_id for _, (room_id, _) in dated}
+        result.update(room_id for cell, (room_id, group_id) in weekly if (cell, group_id) not in overrides)
+        return result
+
+    def apply_change(self, db: Session, removed=None, added=None):
+        """Учитывает изменение одного занятия после commit (см. apply_changes)"""
+        self.apply_changes(db, [removed] if removed else [], [added] if added else [])
+
+    def apply_changes(self, db: Session, removed=(), added=()):
+        """
+        Учитывает изменения занятий одного запроса после commit.
+        Записи — (template_id, date, day_of_week, lesson_number, is_above_line, room_id, group_id).
+        Версия каждого шаблона должна вырасти ровно на единицу (только от этого
+        запроса), иначе шаблон перестраивается при следующем поиске.
+        """
+        changes = [(entry, -1) for entry in removed] + [(entry, 1) for entry in added]
+        template_ids = {entry[0] for entry, _ in changes}
+        if not template_ids:
+            return
+        versions = dict(db.query(ScheduleTemplate.id, ScheduleTemplate.version).filter(
+            ScheduleTemplate.id.in_(template_ids)
+        ).all())
+        with self._lock:
+            for template_id in template_ids:
+                occupancy = self._templates.get(template_id)
+                if occupancy is None:
+                    continue
+                if versions.get(template_id) != occupancy.version + 1:
+                    del self._templates[template_id]
+                    continue
+                for entry, delta in changes:
+                    if entry[0] == template_id:
+                        occupancy.add(*entry[1:], delta=delta)
+                occupancy.version = versions[template_id]
+
+occupancy_index = OccupancyIndex()
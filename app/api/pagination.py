@@ -0,0 +1,101 @@
+"""
+Keyset-пагинация списков по стабильному ключу сортировки.
+Курсор — непрозрачная строка (base64 от значений ключа последней строки),
+следующая страница читается условием (ключ) > (курсор), без OFFSET.
+Курсор следующей страницы отдается в заголовке X-Next-Cursor, поэтому
+тело ответа остается прежним списком.
+"""
+from datetime import date, datetime
+from typing import Optional
+import base64
+import binascii
+import json
+import sys
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, (date, datetime)) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, columns) -> list:
+    """Значения ключа из курсора с типами колонок; неверный курсор — 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        result = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            result.append(value)
+        return result
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Неверный курсор страницы")
+
+def page_limit(limit: Optional[int]) -> int:
+    """Без limit отдается страница по умолчанию: ответы без пагинации тоже ограничены"""
+    if limit is None:
+        return settings.PAGE_DEFAULT_LIMIT
+    return min(limit, settings.PAGE_MAX_LIMIT)
+
+def paginate(query, columns, cursor: Optional[str], limit: Optional[int]):
+    """
+    Страница запроса по ключу columns.
+    Возвращает строки (объекты или кортежи) и курсор следующей страницы или None.
+    """
+    limit = page_limit(limit)
+    key = tuple_(*columns)
+    if cursor:
+        values = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key > values)
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    # Кортеж из запроса колонок или ORM-объект
+    mapping = getattr(last, "_mapping", None)
+    if mapping is not None:
+        values = [mapping[column] for column in columns]
+    else:
+        values = [getattr(last, column.key) for column in columns]
+    return rows, encode_cursor(values)
+
+def _key_values(row, columns) -> tuple:
+    if isinstance(row, dict):
+        return tuple(row[column.key] for column in columns)
+    mapping = getattr(row, "_mapping", None)
+    if mapping is not None:
+        return tuple(mapping[column] for column in columns)
+    return tuple(getattr(row, column.key) for column in columns)
+
+def merge_page(rows, next_cursor: Optional[str], extra, columns, cursor: Optional[str], limit: Optional[int]):
+    """
+    Дополняет страницу paginate строками extra, вычисленными в памяти
+    (словари с ключами колонок), с тем же порядком по columns и курсором.
+    """
+    limit = page_limit(limit)
+    if cursor:
+        after = tuple(decode_cursor(cursor, columns))
+        extra = [row for row in extra if _key_values(row, columns) > after]
+    if not extra:
+        return rows, next_cursor
+    # Строки из базы, не попавшие в страницу, идут после всех ее строк,
+    # поэтому первые limit строк объединения определены верно
+    merged = sorted(list(rows) + extra, key=lambda row: _key_values(row, columns))
+    if next_cursor is None and len(merged) <= limit:
+        return merged, None
+    merged = merged[:limit]
+    return merged, encode_cursor(_key_values(merged[-1], columns))
@@ -0,0 +1,202 @@
+"""
+Разворачивание расписания на весь семестр в конкретные даты.
+Занятия таких шаблонов хранятся по одному на день недели (day_of_week),
+а дата в строке — лишь день их создания, поэтому запросы по
+Schedule.date их не видят. Здесь еженедельные занятия разворачиваются по
+датам запрошенного периода в пределах периода шаблона.
+Занятия шаблона по дням недели кэшируются в памяти воркера до изменения
+версии шаблона или справочников (названия берутся из join'ов).
+Занятие на конкретную дату (обычного шаблона или строка шаблона на весь
+семестр без day_of_week) перекрывает еженедельное занятие той же группы в
+той же ячейке (дата, пара, над/под чертой).
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from typing import Optional
+import threading
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate
+from app.api.versions import REFERENCE_TABLES, table_versions
+
+LessonRow = namedtuple("LessonRow", [
+    "date", "day_of_week", "lesson_number", "lesson_id", "lesson_name", "teacher_id", "teacher_name",
+    "group_id", "group_name", "group_type", "room_id", "room_number", "is_above_line", "lesson_type",
+    "id", "template_id"
+])
+
+# template_id -> ((версия шаблона, версии справочников), {день недели: [LessonRow]})
+_pattern_cache = {}
+_pattern_lock = threading.Lock()
+
+def lesson_rows_query(db: Session):
+    """Занятия в виде кортежей LessonRow одним запросом с join'ами"""
+    return db.query(
+        Schedule.date,
+        Schedule.day_of_week,
+        Schedule.lesson_number,
+        Lessons.id,
+        Lessons.name,
+        Teachers.id,
+        Teachers.name,
+        Groups.id,
+        Groups.name,
+        Groups.type,
+        Rooms.id,
+        Rooms.number,
+        Schedule.is_above_line,
+        Schedule.lesson_type,
+        Schedule.id,
+        Schedule.template_id
+    ).join(
+        Lessons, Schedule.lesson_id == Lessons.id
+    ).join(
+        Teachers, Schedule.teacher_id == Teachers.id
+    ).join(
+        Groups, Schedule.group_id == Groups.id
+    ).join(
+        Rooms, Schedule.room_id == Rooms.id
+    )
+
+def weekly_templates(db: Session, date_start: date, date_end: date) -> list:
+    """Шаблоны на весь семестр, пересекающиеся с периодом"""
+    return db.query(
+        ScheduleTemplate.id, ScheduleTemplate.version, ScheduleTemplate.date_start, ScheduleTemplate.date_end
+    ).filter(
+        ScheduleTemplate.is_full_semester.is_(True),
+        ScheduleTemplate.date_start <= date_end,
+        ScheduleTemplate.date_end >= date_start
+    ).all()
+
+def dated_condition(templates):
+    """Условие, исключающее из выборки по Schedule.date еженедельные занятия шаблонов templates"""
+    return or_(Schedule.day_of_week.is_(None), Schedule.template_id.notin_([template.id for template in templates]))
+
+def weekly_rows_query(db: Session, template_id: int):
+    """Еженедельные занятия шаблона (индекс ix_schedules_template_day)"""
+    return lesson_rows_query(db).filter(
+        Schedule.template_id == template_id,
+        Schedule.day_of_week.isnot(None)
+    ).order_by(Schedule.lesson_number, Schedule.id)
+
+def _template_pattern(db: Session, template, references: str) -> dict:
+    key = (template.version, references)
+    with _pattern_lock:
+        cached = _pattern_cache.get(template.id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    pattern = defaultdict(list)
+    for row in weekly_rows_query(db, template.id):
+        pattern[row[1]].append(LessonRow(*row))
+    pattern = dict(pattern)
+    with _pattern_lock:
+        _pattern_cache[template.id] = (key, pattern)
+    return pattern
+
+def occurrences(db: Session, templates, date_start: date, date_end: date, group_ids=None, teacher_ids=None) -> list:
+    """
+    Еженедельные занятия шаблонов с конкретными датами периода.
+    Без group_ids и teacher_ids — все занятия, иначе занятия указанных групп или преподавателей.
+    """
+    references = table_versions(db, REFERENCE_TABLES)
+    groups = set(group_ids or ())
+    teachers = set(teacher_ids or ())
+    everything = not groups and not teachers
+    result = []
+    for template in templates:
+        pattern = _template_pattern(db, template, references)
+        if not pattern:
+            continue
+        day = max(date_start, template.date_start)
+        last_day = min(date_end, template.date_end)
+        while day <= last_day:
+            for row in pattern.get(day.isoweekday(), ()):
+                if everything or row.group_id in groups or row.teacher_id in teachers:
+                    result.append(row._replace(date=day))
+            day += timedelta(days=1)
+    return result
+
+def is_dated():
+    """Условие для запроса с join ScheduleTemplate: занятие на конкретную дату, а не еженедельное"""
+    return or_(Schedule.day_of_week.is_(None), ScheduleTemplate.is_full_semester.isnot(True))
+
+def override_slots(db: Session, group_ids, date_start: date, date_end: date, exclude_ids=()) -> set:
+    """
+    Ячейки (группа, дата, пара, над чертой) занятий групп на конкретные даты
+    периода: в этих ячейках еженедельные занятия группы не проводятся.
+    exclude_ids — занятия, которые не учитываются (например, изменяемые).
+    """
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if not group_ids:
+        return set()
+    query = db.query(
+        Schedule.group_id, Schedule.date, Schedule.lesson_number, Schedule.is_above_line
+    ).join(
+        ScheduleTemplate, Schedule.template_id == ScheduleTemplate.id
+    ).filter(
+        Schedule.group_id.in_(group_ids),
+        Schedule.date >= date_start,
+        Schedule.date <= date_end,
+        is_dated()
+    )
+    if exclude_ids:
+        query = query.filter(Schedule.id.notin_(list(exclude_ids)))
+    return {(group_id, day, lesson_number, bool(is_above_line)) for group_id, day, lesson_number, is_above_line in query}
+
+def drop_overridden(db: Session, rows, date_start: date, date_end: date) -> list:
+    """Убирает развернутые еженедельные занятия, перекрытые занятиями своей группы на конкретную дату"""
+    if not rows:
+        return rows
+    slots = override_slots(db, {row.group_id for row in rows}, date_start, date_end)
+    if not slots:
+        return rows
+    return [row for row in rows if (row.group_id, row.date, row.lesson_number, bool(row.is_above_line)) not in slots]
+
+def resolve_lessons(
+    db: Session,
+    query,
+    date_start: date,
+    date_end: date,
+    group_ids=None,
+    teacher_ids=None,
+    templates: Optional[list] = None
+) -> list:
+    """
+    Занятия периода как LessonRow: строки запроса query (lesson_rows_query с фильтрами
+    по дате и сущностям) плюс развернутые еженедельные занятия тех же групп или преподавателей.
+    Если еженедельных занятий нет, порядок строк query сохраняется, иначе
+    результат упорядочен по дате и номеру пары.
+    """
+    if templates is None:
+        templates = weekly_templates(db, date_start, date_end)
+    if not templates:
+        return [LessonRow(*row) for row in query]
+    rows = [LessonRow(*row) for row in query.filter(dated_condition(templates))]
+    weekly = drop_overridden(
+        db, occurrences(db, templates, date_start, date_end, group_ids, teacher_ids), date_start, date_end
+    )
+    if not weekly:
+        return rows
+    return sorted(rows + weekly, key=lambda row: (row.date, row.lesson_number))
+
+def schedule_occurrences(db: Session, templates, date_start: date, date_end: date, group_ids) -> list:
+    """Еженедельные занятия групп в формате ScheduleResponse для /api/schedule"""
+    rows = drop_overridden(db, occurrences(db, templates, date_start, date_end, group_ids), date_start, date_end)
+    return [
+        {
+            "id": row.id,
+            "template_id": row.template_id,
+            "date": row.date,
+            "group_id": row.group_id,
+            "lesson_id": row.lesson_id,
+            "teacher_id": row.teacher_id,
+            "room_id": row.room_id,
+            "lesson_number": row.lesson_number,
+            "is_above_line": row.is_above_line,
+            "lesson_type": row.lesson_type,
+            "day_of_week": row.day_of_week
+        }
+        for row in rows
+    ]
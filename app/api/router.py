@@ -1,27 +1,46 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status, BackgroundTasks, Query
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse
+from sqlalchemy.orm import Session, contains_eager
 from datetime import datetime, date, timedelta
 from typing import Optional, List
 from fastapi.security import OAuth2PasswordRequestForm
-import io
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import json
 import os
-import re
+import uuid
 
 from app.api.database import SessionLocal
-from app.api.schemas import GroupCreate, TeacherCreate, TeacherUpdate, LessonsCreate, LessonsUpdate, ScheduleCreate, RoomCreate, RoomUpdate, ScheduleTemplateCreate, ScheduleTemplateResponse, ScheduleResponse, ScheduleWithDetails, UserCreate, UserResponse, Token, TodoCreate, TodoUpdate, TodoResponse
-from app.api.models import Groups, Teachers, Lessons, Schedule, Rooms, ScheduleTemplate, User, Todo
+from config import settings
+from app.api.schemas import GroupCreate, TeacherCreate, TeacherUpdate, LessonsCreate, LessonsUpdate, ScheduleCreate, RoomCreate, RoomUpdate, ScheduleTemplateCreate, ScheduleTemplateResponse, ScheduleTemplateClone, ScheduleTemplateCloneResponse, ScheduleResponse, ScheduleBulkCreate, ScheduleBulkResponse, ScheduleWithDetails, UserCreate, UserResponse, Token, TodoCreate, TodoUpdate, TodoResponse, ExportJobCreate, ExportJobResponse
+from app.api.models import Groups, Teachers, Lessons, Schedule, Rooms, ScheduleTemplate, User, Todo, ExportJob
 from app.api.utils import extract_year
+from app.api.export import (
+    render_export_file, build_sheet_data, render_workbook_file, export_filename, iter_file_chunks, EXPORT_MEDIA_TYPES
+)
+from app.api.executor import export_slot, run_export, ExportBusyError
+from app.api.snapshots import load_template_snapshot, load_template_snapshots
+from app.api.cache import export_cache, export_cache_key
+from app.api.calendar import calendar_response
+from app.api.http_cache import make_etag, validator_headers, is_not_modified, not_modified_response
+from app.api.streams import iter_csv, iter_ndjson
+from app.api.jobs import run_export_job, expire_job, cleanup_jobs
+from app.api.versions import (
+    bump_template_version, bump_group_type_versions, bump_templates_using, bump_table_versions, schedule_etag,
+    table_versions
+)
+from app.api.schedule_cache import schedule_cache
+from app.api.occupancy import occupancy_index, occupancy_entry
+from app.api.workload import teacher_workload, WORKLOAD_PERIODS
+from app.api.schedule_bulk import validate_bulk, insert_bulk
+from app.api.conflicts import check_conflicts, template_conflicts
+from app.api.template_clone import clone_template
+from app.api.recurrence import weekly_templates, dated_condition, schedule_occurrences
+from app.api.changes import record_changes, changes_since
+from app.api.schedule_rows import group_lessons, teacher_lessons, batch_lessons, schedule_details_query, schedule_details
+from app.api.pagination import paginate, merge_page, NEXT_CURSOR_HEADER
+from app.api.fast_json import FastJSONResponse
 from app.api.auth import (
     verify_password, get_password_hash, create_access_token,
     get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -31,6 +50,10 @@ api_router = APIRouter(prefix="/api")
 html_router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
+# Ключи сортировки для keyset-пагинации
+SCHEDULE_PAGE_KEY = (Schedule.template_id, Schedule.date, Schedule.lesson_number, Schedule.id)
+TODO_PAGE_KEY = (Todo.created_at, Todo.id)
+
 # Dependency для получения сессии базы данных
 def get_db():
     db = SessionLocal()
@@ -130,6 +153,8 @@ async def new_group(group: GroupCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Группа с таким именем уже существует.")
     db_group = Groups(name=group.name, type=group.type, description=group.description)
     db.add(db_group)
+    bump_group_type_versions(db, group.type)
+    bump_table_versions(db, "groups")
     db.commit()
     db.refresh(db_group)
     db.close()
@@ -141,7 +166,10 @@ async def delete_group(group_id: int, db: Session = Depends(get_db)):
     if not deletes_group:
         raise HTTPException(status_code=404, detail="Группа не найдена")
     db.delete(deletes_group)
+    bump_group_type_versions(db, deletes_group.type)
+    bump_table_versions(db, "groups")
     db.commit()
+    schedule_cache.clear()
     db.close()
     return {"ok": True}
 
@@ -152,6 +180,7 @@ async def new_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Такой преподаватель уже существует.")
     db_teacher = Teachers(name=teacher.name, description=teacher.description)
     db.add(db_teacher)
+    bump_table_versions(db, "teachers")
     db.commit()
     db.refresh(db_teacher)
     db.close()
@@ -164,7 +193,10 @@ async def update_teacher(teacher_id: int, teacher: TeacherUpdate, db: Session =
         raise HTTPException(status_code=404, detail="Преподаватель не найден")
     existing_teacher.name = teacher.name
     existing_teacher.description = teacher.description
+    bump_templates_using(db, Schedule.teacher_id, teacher_id)
+    bump_table_versions(db, "teachers")
     db.commit()
+    schedule_cache.clear()
     db.refresh(existing_teacher)
     db.close()
     return {"message": "Teacher updated successfully!"}
@@ -175,7 +207,10 @@ async def delete_teacher(teacher_id: int, db: Session = Depends(get_db)):
     if not deletes_teacher:
         raise HTTPException(status_code=404, detail="Преподаватель не найден")
     db.delete(deletes_teacher)
+    bump_templates_using(db, Schedule.teacher_id, teacher_id)
+    bump_table_versions(db, "teachers")
     db.commit()
+    schedule_cache.clear()
     db.close()
     return {"ok": True}
 
@@ -189,6 +224,7 @@ async def new_teacher(lesson: LessonsCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Lesson with this teacher already exists.")
     db_lesson = Lessons(name=lesson.name, teacher_id=lesson.teacher)
     db.add(db_lesson)
+    bump_table_versions(db, "lessons")
     db.commit()
     db.refresh(db_lesson)
     db.close()
@@ -200,7 +236,10 @@ async def delete_teacher(lesson_id: int, db: Session = Depends(get_db)):
     if not deletes_lesson:
         raise HTTPException(status_code=404, detail="Предмет не найден")
     db.delete(deletes_lesson)
+    bump_templates_using(db, Schedule.lesson_id, lesson_id)
+    bump_table_versions(db, "lessons")
     db.commit()
+    schedule_cache.clear()
     db.close()
     return {"ok": True}
 
@@ -221,7 +260,10 @@ async def update_lesson(lesson_id: int, lesson: LessonsUpdate, db: Session = Dep
     
     existing_lesson.name = lesson.name
     existing_lesson.teacher_id = lesson.teacher
+    bump_templates_using(db, Schedule.lesson_id, lesson_id)
+    bump_table_versions(db, "lessons")
     db.commit()
+    schedule_cache.clear()
     db.refresh(existing_lesson)
     db.close()
     return {"message": "Lesson updated successfully!"}
@@ -265,10 +307,40 @@ def create_schedule_template(
         schedule_type=template.schedule_type
     )
     db.add(db_template)
+    bump_table_versions(db, "schedule_templates")
     db.commit()
     db.refresh(db_template)
     return db_template
 
+@api_router.post(
+    "/schedule-templates/{template_id}/clone",
+    response_model=ScheduleTemplateCloneResponse,
+    summary="Копирование шаблона расписания в новый период"
+)
+def clone_schedule_template(template_id: int, clone: ScheduleTemplateClone, db: Session = Depends(get_db)):
+    template = db.query(ScheduleTemplate).filter(ScheduleTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
+    db_template, copied = clone_template(db, template, clone)
+    if settings.SCHEDULE_CONFLICT_CHECK:
+        # Копия в новом периоде может занять преподавателей и кабинеты других шаблонов
+        conflicts = template_conflicts(db, db_template)
+        if conflicts:
+            db.rollback()
+            return _conflict_response(conflicts)
+    record_changes(db, "schedules", "create", db.query(Schedule.id).filter(Schedule.template_id == db_template.id))
+    bump_table_versions(db, "schedule_templates")
+    db.commit()
+    db.refresh(db_template)
+    # Новые занятия попадают в закэшированные ответы групп и преподавателей
+    affected = db.query(Schedule.group_id, Schedule.teacher_id).filter(
+        Schedule.template_id == db_template.id
+    ).distinct().all()
+    for group_id, teacher_id in affected:
+        schedule_cache.invalidate("group", group_id, db_template.date_start, db_template.date_end)
+        schedule_cache.invalidate("teacher", teacher_id, db_template.date_start, db_template.date_end)
+    return {"template": db_template, "copied": copied}
+
 @api_router.post("/schedule", response_model=ScheduleResponse)
 async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db)):
     # Проверяем существование шаблона
@@ -304,6 +376,12 @@ async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db
     if not room:
         raise HTTPException(status_code=404, detail="Кабинет не найден")
     
+    # Проверяем накладки преподавателя и кабинета
+    if settings.SCHEDULE_CONFLICT_CHECK:
+        conflicts = check_conflicts(db, [schedule])
+        if conflicts:
+            return _conflict_response(conflicts)
+    
     # Создаем новое расписание
     db_schedule = Schedule(
         template_id=schedule.template_id,
@@ -319,11 +397,41 @@ async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db
     )
     
     db.add(db_schedule)
+    bump_template_version(db, schedule.template_id)
     db.commit()
+    schedule_cache.invalidate_lesson(schedule.group_id, schedule.teacher_id, schedule.date, schedule.day_of_week)
+    occupancy_index.apply_change(db, added=occupancy_entry(schedule))
     db.refresh(db_schedule)
     
     return db_schedule
 
+@api_router.post("/schedule/bulk", response_model=ScheduleBulkResponse, summary="Пакетное добавление занятий")
+def create_schedule_bulk(bulk: ScheduleBulkCreate, db: Session = Depends(get_db)):
+    """Все занятия добавляются в одной транзакции или, при любой ошибке, не добавляется ни одно"""
+    items = bulk.items
+    if len(items) > settings.SCHEDULE_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Не больше {settings.SCHEDULE_BULK_MAX_ITEMS} занятий за запрос")
+    if not items:
+        return {"created": 0, "ids": []}
+    errors = validate_bulk(db, items)
+    if errors:
+        return JSONResponse(
+            status_code=422,
+            content={"detail": "Занятия не добавлены: есть ошибки", "errors": errors}
+        )
+    if settings.SCHEDULE_CONFLICT_CHECK:
+        conflicts = check_conflicts(db, items)
+        if conflicts:
+            return _conflict_response(conflicts)
+    ids = insert_bulk(db, items)
+    record_changes(db, "schedules", "create", ids)
+    bump_template_version(db, *{item.template_id for item in items})
+    db.commit()
+    for item in items:
+        schedule_cache.invalidate_lesson(item.group_id, item.teacher_id, item.date, item.day_of_week)
+    occupancy_index.apply_changes(db, added=[occupancy_entry(item) for item in items])
+    return {"created": len(ids), "ids": ids}
+
 @api_router.get("/groups", summary="Получение списка групп")
 async def get_groups(db: Session = Depends(get_db)):
     groups = db.query(Groups).all()
@@ -336,6 +444,8 @@ async def create_group_api(group: GroupCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Группа с таким именем уже существует.")
     db_group = Groups(name=group.name, type=group.type, description=group.description)
     db.add(db_group)
+    bump_group_type_versions(db, group.type)
+    bump_table_versions(db, "groups")
     db.commit()
     db.refresh(db_group)
     return {"message": "Group added successfully!", "id": db_group.id}
@@ -357,10 +467,33 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
         description=room.description
     )
     db.add(db_room)
+    bump_table_versions(db, "rooms")
     db.commit()
     db.refresh(db_room)
     return {"message": "Room added successfully!"}
 
+@api_router.get("/rooms/free", summary="Поиск свободных кабинетов")
+def get_free_rooms(
+    day: date = Query(..., alias="date"),
+    lesson_from: int = Query(1, ge=1),
+    lesson_to: Optional[int] = Query(None, ge=1),
+    is_above_line: Optional[bool] = Query(None, description="Без параметра кабинет должен быть свободен и над, и под чертой"),
+    min_capacity: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Кабинеты, свободные на дату во всех парах с lesson_from по lesson_to"""
+    lesson_to = lesson_to or lesson_from
+    if lesson_to < lesson_from:
+        raise HTTPException(status_code=400, detail="lesson_to меньше lesson_from")
+    occupied = occupancy_index.occupied_rooms(db, day, range(lesson_from, lesson_to + 1), is_above_line)
+    query = db.query(Rooms)
+    if min_capacity is not None:
+        query = query.filter(Rooms.capacity >= min_capacity)
+    return [
+        {"id": room.id, "number": room.number, "capacity": room.capacity, "description": room.description}
+        for room in query.order_by(Rooms.number) if room.id not in occupied
+    ]
+
 @api_router.put("/rooms/{room_id}", summary="Обновление информации о кабинете")
 async def update_room(room_id: int, room: RoomUpdate, db: Session = Depends(get_db)):
     db_room = db.query(Rooms).filter(Rooms.id == room_id).first()
@@ -379,7 +512,10 @@ async def update_room(room_id: int, room: RoomUpdate, db: Session = Depends(get_
     if room.description is not None:
         db_room.description = room.description
     
+    bump_templates_using(db, Schedule.room_id, room_id)
+    bump_table_versions(db, "rooms")
     db.commit()
+    schedule_cache.clear()
     db.refresh(db_room)
     return {"message": "Room updated successfully!"}
 
@@ -390,7 +526,10 @@ async def delete_room(room_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Кабинет не найден")
     
     db.delete(db_room)
+    bump_templates_using(db, Schedule.room_id, room_id)
+    bump_table_versions(db, "rooms")
     db.commit()
+    schedule_cache.clear()
     return {"message": "Room deleted successfully!"}
 
 @api_router.delete("/groups/{group_id}", summary="Удаление группы")
@@ -399,7 +538,10 @@ async def delete_group(group_id: int, db: Session = Depends(get_db)):
     if not db_group:
         raise HTTPException(status_code=404, detail="Group not found")
     db.delete(db_group)
+    bump_group_type_versions(db, db_group.type)
+    bump_table_versions(db, "groups")
     db.commit()
+    schedule_cache.clear()
     return {"message": "Group deleted successfully!"}
 
 @api_router.put("/groups/{group_id}", summary="Обновление группы")
@@ -411,10 +553,13 @@ async def update_group(group_id: int, group: GroupCreate, db: Session = Depends(
     existing_group = db.query(Groups).filter(Groups.name == group.name, Groups.id != group_id).first()
     if existing_group:
         raise HTTPException(status_code=400, detail="Group with this name already exists")
+    bump_group_type_versions(db, db_group.type, group.type)
     db_group.name = group.name
     db_group.type = group.type
     db_group.description = group.description
+    bump_table_versions(db, "groups")
     db.commit()
+    schedule_cache.clear()
     db.refresh(db_group)
     return {"message": "Group updated successfully!"}
 
@@ -423,9 +568,21 @@ async def get_schedule(
     date_start: str,
     date_end: str,
     group_type: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db)
 ):
     try:
+        etag = schedule_etag(
+            db, "schedule", date_start, date_end, group_type, cursor, limit,
+            tables=("groups", "schedule_templates"), date_start=date_start, date_end=date_end
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers.update(validator_headers(etag))
+
         # Получаем все группы указанного типа
         groups = db.query(Groups).filter(Groups.type == group_type).all()
         if not groups:
@@ -434,21 +591,40 @@ async def get_schedule(
         group_ids = [group.id for group in groups]
         
         # Получаем расписание для выбранных групп и дат
-        schedule = db.query(Schedule).filter(
+        query = db.query(Schedule).filter(
             Schedule.date >= date_start,
             Schedule.date <= date_end,
             Schedule.group_id.in_(group_ids)
-        ).all()
+        )
+        # Еженедельные занятия шаблонов на весь семестр разворачиваются по датам периода
+        period_start, period_end = date.fromisoformat(date_start), date.fromisoformat(date_end)
+        templates = weekly_templates(db, period_start, period_end)
+        if templates:
+            query = query.filter(dated_condition(templates))
+        schedule, next_cursor = paginate(query, SCHEDULE_PAGE_KEY, cursor, limit)
+        if templates:
+            weekly = schedule_occurrences(db, templates, period_start, period_end, group_ids)
+            schedule, next_cursor = merge_page(schedule, next_cursor, weekly, SCHEDULE_PAGE_KEY, cursor, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return schedule
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/schedule-templates", response_model=List[ScheduleTemplateResponse])
 def get_schedule_templates(
+    request: Request,
+    response: Response,
     group_type: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    etag = make_etag("schedule-templates", group_type, table_versions(db, ("schedule_templates",)))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
     query = db.query(ScheduleTemplate)
     if group_type:
         query = query.filter(ScheduleTemplate.group_type == group_type)
@@ -463,9 +639,26 @@ def get_schedule_template(template_id: int, db: Session = Depends(get_db)):
 
 @api_router.get("/schedules", response_model=List[ScheduleWithDetails])
 def get_schedules(
+    request: Request,
+    response: Response,
     template_id: Optional[int] = None,
+    fast: bool = Query(False, description="Отдать JSON без моделей pydantic (для больших шаблонов)"),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db)
 ):
+    # Проверка ETag не читает таблицу schedules
+    etag = schedule_etag(db, "schedules", template_id, cursor, limit, template_id=template_id or None)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    headers = validator_headers(etag)
+    if fast:
+        rows, next_cursor = paginate(schedule_details_query(db, template_id), SCHEDULE_PAGE_KEY, cursor, limit)
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+        return FastJSONResponse(schedule_details(rows), headers=headers)
+    # Связи заполняются из тех же join'ов (contains_eager), преподаватель предмета —
+    # отдельным LEFT JOIN; вся страница читается одним запросом без догрузок по строкам
     query = db.query(Schedule).join(
         Schedule.lesson
     ).join(
@@ -476,10 +669,28 @@ def get_schedules(
         Schedule.group
     ).join(
         Schedule.template
+    ).options(
+        contains_eager(Schedule.lesson).joinedload(Lessons.teacher),
+        contains_eager(Schedule.teacher),
+        contains_eager(Schedule.room),
+        contains_eager(Schedule.group),
+        contains_eager(Schedule.template)
     )
     if template_id:
         query = query.filter(Schedule.template_id == template_id)
-    return query.all()
+    schedules, next_cursor = paginate(query, SCHEDULE_PAGE_KEY, cursor, limit)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers.update(headers)
+    return schedules
+
+@api_router.get("/schedule-templates/{template_id}/conflicts", summary="Накладки преподавателей и кабинетов в шаблоне")
+def get_template_conflicts(template_id: int, db: Session = Depends(get_db)):
+    template = db.query(ScheduleTemplate).filter(ScheduleTemplate.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
+    conflicts = template_conflicts(db, template)
+    return {"template_id": template_id, "count": len(conflicts), "conflicts": conflicts}
 
 @api_router.delete("/schedule-templates/{template_id}", summary="Удаление шаблона расписания")
 async def delete_schedule_template(template_id: int, db: Session = Depends(get_db)):
@@ -487,12 +698,23 @@ async def delete_schedule_template(template_id: int, db: Session = Depends(get_d
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
     
+    # Группы и преподаватели шаблона, чьи ответы в кэше нужно сбросить
+    affected = db.query(Schedule.group_id, Schedule.teacher_id).filter(
+        Schedule.template_id == template_id
+    ).distinct().all()
+    period = (template.date_start, template.date_end)
+    
     # Удаляем все связанные расписания
+    record_changes(db, "schedules", "delete", db.query(Schedule.id).filter(Schedule.template_id == template_id))
     db.query(Schedule).filter(Schedule.template_id == template_id).delete()
     
     # Удаляем сам шаблон
     db.delete(template)
+    bump_table_versions(db, "schedule_templates")
     db.commit()
+    for group_id, teacher_id in affected:
+        schedule_cache.invalidate("group", group_id, *period)
+        schedule_cache.invalidate("teacher", teacher_id, *period)
     return {"message": "Шаблон расписания успешно удален"}
 
 @api_router.post("/token", response_model=Token)
@@ -556,51 +778,28 @@ async def get_group_schedule(
     group_id: int,
     date_start: date,
     date_end: date,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
+    etag = schedule_etag(db, "v1-group", group_id, date_start, date_end, date_start=date_start, date_end=date_end)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
+    cache_key = schedule_cache.key("group", group_id, date_start, date_end, etag=etag)
+    cached = schedule_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
         # Проверяем существование группы
         group = db.query(Groups).filter(Groups.id == group_id).first()
         if not group:
             raise HTTPException(status_code=404, detail="Группа не найдена")
 
-        # Получаем расписание для группы
-        schedule = db.query(Schedule).filter(
-            Schedule.group_id == group_id,
-            Schedule.date >= date_start,
-            Schedule.date <= date_end
-        ).join(
-            Schedule.lesson
-        ).join(
-            Schedule.teacher
-        ).join(
-            Schedule.room
-        ).all()
-
-        # Формируем ответ
-        result = []
-        for item in schedule:
-            result.append({
-                "date": item.date.isoformat(),
-                "day_of_week": item.day_of_week,
-                "lesson_number": item.lesson_number,
-                "lesson": {
-                    "id": item.lesson.id,
-                    "name": item.lesson.name
-                },
-                "teacher": {
-                    "id": item.teacher.id,
-                    "name": item.teacher.name
-                },
-                "room": {
-                    "id": item.room.id,
-                    "number": item.room.number
-                },
-                "is_above_line": item.is_above_line,
-                "lesson_type": item.lesson_type
-            })
-
-        return {
+        # Получаем расписание для группы одним запросом
+        result = group_lessons(db, group_id, date_start, date_end)
+
+        payload = {
             "group": {
                 "id": group.id,
                 "name": group.name,
@@ -608,6 +807,8 @@ async def get_group_schedule(
             },
             "schedule": result
         }
+        schedule_cache.set(cache_key, payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -618,58 +819,36 @@ async def get_teacher_schedule(
     teacher_id: int,
     date_start: date,
     date_end: date,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
+    etag = schedule_etag(db, "v1-teacher", teacher_id, date_start, date_end, date_start=date_start, date_end=date_end)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(validator_headers(etag))
+    cache_key = schedule_cache.key("teacher", teacher_id, date_start, date_end, etag=etag)
+    cached = schedule_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
         # Проверяем существование преподавателя
         teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
         if not teacher:
             raise HTTPException(status_code=404, detail="Преподаватель не найден")
 
-        # Получаем расписание для преподавателя
-        schedule = db.query(Schedule).filter(
-            Schedule.teacher_id == teacher_id,
-            Schedule.date >= date_start,
-            Schedule.date <= date_end
-        ).join(
-            Schedule.lesson
-        ).join(
-            Schedule.group
-        ).join(
-            Schedule.room
-        ).all()
-
-        # Формируем ответ
-        result = []
-        for item in schedule:
-            result.append({
-                "date": item.date.isoformat(),
-                "day_of_week": item.day_of_week,
-                "lesson_number": item.lesson_number,
-                "lesson": {
-                    "id": item.lesson.id,
-                    "name": item.lesson.name
-                },
-                "group": {
-                    "id": item.group.id,
-                    "name": item.group.name,
-                    "type": item.group.type
-                },
-                "room": {
-                    "id": item.room.id,
-                    "number": item.room.number
-                },
-                "is_above_line": item.is_above_line,
-                "lesson_type": item.lesson_type
-            })
-
-        return {
+        # Получаем расписание для преподавателя одним запросом
+        result = teacher_lessons(db, teacher_id, date_start, date_end)
+
+        payload = {
             "teacher": {
                 "id": teacher.id,
                 "name": teacher.name
             },
             "schedule": result
         }
+        schedule_cache.set(cache_key, payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -678,59 +857,36 @@ async def get_teacher_schedule(
     description="Возвращает расписание для указанной группы на текущую неделю")
 async def get_group_week_schedule(
     group_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     try:
+        # Получаем даты начала и конца текущей недели
+        today = date.today()
+        start_of_week = today - timedelta(days=today.weekday())
+        end_of_week = start_of_week + timedelta(days=6)
+        etag = schedule_etag(
+            db, "v1-group-week", group_id, start_of_week, end_of_week,
+            date_start=start_of_week, date_end=end_of_week
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers.update(validator_headers(etag))
+        cache_key = schedule_cache.key("group", group_id, start_of_week, end_of_week, "week", etag=etag)
+        cached = schedule_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Проверяем существование группы
         group = db.query(Groups).filter(Groups.id == group_id).first()
         if not group:
             raise HTTPException(status_code=404, detail="Группа не найдена")
 
-        # Получаем даты начала и конца текущей недели
-        today = date.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        end_of_week = start_of_week + timedelta(days=6)
+        # Получаем расписание для группы одним запросом
+        result = group_lessons(db, group_id, start_of_week, end_of_week, ordered=True)
 
-        # Получаем расписание для группы
-        schedule = db.query(Schedule).filter(
-            Schedule.group_id == group_id,
-            Schedule.date >= start_of_week,
-            Schedule.date <= end_of_week
-        ).join(
-            Schedule.lesson
-        ).join(
-            Schedule.teacher
-        ).join(
-            Schedule.room
-        ).order_by(
-            Schedule.date,
-            Schedule.lesson_number
-        ).all()
-
-        # Формируем ответ
-        result = []
-        for item in schedule:
-            result.append({
-                "date": item.date.isoformat(),
-                "day_of_week": item.day_of_week,
-                "lesson_number": item.lesson_number,
-                "lesson": {
-                    "id": item.lesson.id,
-                    "name": item.lesson.name
-                },
-                "teacher": {
-                    "id": item.teacher.id,
-                    "name": item.teacher.name
-                },
-                "room": {
-                    "id": item.room.id,
-                    "number": item.room.number
-                },
-                "is_above_line": item.is_above_line,
-                "lesson_type": item.lesson_type
-            })
-
-        return {
+        payload = {
             "group": {
                 "id": group.id,
                 "name": group.name,
@@ -740,6 +896,8 @@ async def get_group_week_schedule(
             "week_end": end_of_week.isoformat(),
             "schedule": result
         }
+        schedule_cache.set(cache_key, payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -748,60 +906,36 @@ async def get_group_week_schedule(
     description="Возвращает расписание для указанного преподавателя на текущую неделю")
 async def get_teacher_week_schedule(
     teacher_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     try:
+        # Получаем даты начала и конца текущей недели
+        today = date.today()
+        start_of_week = today - timedelta(days=today.weekday())
+        end_of_week = start_of_week + timedelta(days=6)
+        etag = schedule_etag(
+            db, "v1-teacher-week", teacher_id, start_of_week, end_of_week,
+            date_start=start_of_week, date_end=end_of_week
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers.update(validator_headers(etag))
+        cache_key = schedule_cache.key("teacher", teacher_id, start_of_week, end_of_week, "week", etag=etag)
+        cached = schedule_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Проверяем существование преподавателя
         teacher = db.query(Teachers).filter(Teachers.id == teacher_id).first()
         if not teacher:
             raise HTTPException(status_code=404, detail="Преподаватель не найден")
 
-        # Получаем даты начала и конца текущей недели
-        today = date.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        end_of_week = start_of_week + timedelta(days=6)
+        # Получаем расписание для преподавателя одним запросом
+        result = teacher_lessons(db, teacher_id, start_of_week, end_of_week, ordered=True)
 
-        # Получаем расписание для преподавателя
-        schedule = db.query(Schedule).filter(
-            Schedule.teacher_id == teacher_id,
-            Schedule.date >= start_of_week,
-            Schedule.date <= end_of_week
-        ).join(
-            Schedule.lesson
-        ).join(
-            Schedule.group
-        ).join(
-            Schedule.room
-        ).order_by(
-            Schedule.date,
-            Schedule.lesson_number
-        ).all()
-
-        # Формируем ответ
-        result = []
-        for item in schedule:
-            result.append({
-                "date": item.date.isoformat(),
-                "day_of_week": item.day_of_week,
-                "lesson_number": item.lesson_number,
-                "lesson": {
-                    "id": item.lesson.id,
-                    "name": item.lesson.name
-                },
-                "group": {
-                    "id": item.group.id,
-                    "name": item.group.name,
-                    "type": item.group.type
-                },
-                "room": {
-                    "id": item.room.id,
-                    "number": item.room.number
-                },
-                "is_above_line": item.is_above_line,
-                "lesson_type": item.lesson_type
-            })
-
-        return {
+        payload = {
             "teacher": {
                 "id": teacher.id,
                 "name": teacher.name
@@ -810,16 +944,146 @@ async def get_teacher_week_schedule(
             "week_end": end_of_week.isoformat(),
             "schedule": result
         }
+        schedule_cache.set(cache_key, payload)
+        return payload
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/v1/schedule/batch",
+    summary="Получение расписания нескольких групп и преподавателей",
+    description="Возвращает расписание указанных групп и преподавателей на период одним запросом, по ключам id")
+def get_batch_schedule(
+    date_start: date,
+    date_end: date,
+    request: Request,
+    group_ids: List[int] = Query([]),
+    teacher_ids: List[int] = Query([]),
+    db: Session = Depends(get_db)
+):
+    group_ids = sorted(set(group_ids))
+    teacher_ids = sorted(set(teacher_ids))
+    if not group_ids and not teacher_ids:
+        raise HTTPException(status_code=400, detail="Укажите group_ids или teacher_ids")
+    if len(group_ids) + len(teacher_ids) > settings.SCHEDULE_BATCH_MAX_ENTITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {settings.SCHEDULE_BATCH_MAX_ENTITIES} групп и преподавателей за запрос"
+        )
+    etag = schedule_etag(
+        db, "v1-batch", group_ids, teacher_ids, date_start, date_end, date_start=date_start, date_end=date_end
+    )
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    groups = db.query(Groups).filter(Groups.id.in_(group_ids)).all() if group_ids else []
+    teachers = db.query(Teachers).filter(Teachers.id.in_(teacher_ids)).all() if teacher_ids else []
+    if len(groups) != len(group_ids):
+        missing = sorted(set(group_ids) - {group.id for group in groups})
+        raise HTTPException(status_code=404, detail=f"Группы не найдены: {', '.join(map(str, missing))}")
+    if len(teachers) != len(teacher_ids):
+        missing = sorted(set(teacher_ids) - {teacher.id for teacher in teachers})
+        raise HTTPException(status_code=404, detail=f"Преподаватели не найдены: {', '.join(map(str, missing))}")
+
+    by_group, by_teacher = batch_lessons(db, group_ids, teacher_ids, date_start, date_end)
+    payload = {
+        "date_start": date_start.isoformat(),
+        "date_end": date_end.isoformat(),
+        "groups": {
+            str(group.id): {
+                "group": {"id": group.id, "name": group.name, "type": group.type},
+                "schedule": by_group[group.id]
+            }
+            for group in groups
+        },
+        "teachers": {
+            str(teacher.id): {
+                "teacher": {"id": teacher.id, "name": teacher.name},
+                "schedule": by_teacher[teacher.id]
+            }
+            for teacher in teachers
+        }
+    }
+    return FastJSONResponse(payload, headers=validator_headers(etag))
+
+@api_router.get("/changes", summary="Изменения расписания и справочников",
+    description="Изменения с номерами больше since; при reset=true данные нужно загрузить заново и продолжить с last_seq")
+def get_changes(
+    since: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    return FastJSONResponse(changes_since(db, since, limit))
+
+@api_router.get("/v1/schedule/cache-stats", summary="Статистика кэша ответов расписания")
+def get_schedule_cache_stats():
+    return schedule_cache.stats()
+
+@api_router.get("/workload/teachers", summary="Нагрузка преподавателей",
+    description="Пары и часы по неделям, месяцам или шаблонам с разбивкой по типу занятия")
+def get_teachers_workload(
+    request: Request,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    period: str = Query("week", description="week, month или template"),
+    teacher_ids: List[int] = Query([]),
+    db: Session = Depends(get_db)
+):
+    if period not in WORKLOAD_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period должен быть одним из: {', '.join(WORKLOAD_PERIODS)}")
+    etag = schedule_etag(
+        db, "workload", date_start, date_end, period, sorted(set(teacher_ids)), settings.WORKLOAD_HOURS_PER_LESSON,
+        tables=("teachers", "schedule_templates"), date_start=date_start, date_end=date_end
+    )
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    payload = {
+        "date_start": date_start.isoformat() if date_start else None,
+        "date_end": date_end.isoformat() if date_end else None,
+        "period": period,
+        "hours_per_lesson": settings.WORKLOAD_HOURS_PER_LESSON,
+        "teachers": teacher_workload(db, date_start, date_end, period, teacher_ids)
+    }
+    return FastJSONResponse(payload, headers=validator_headers(etag))
+
+@api_router.get("/v1/calendar/group/{group_id}.ics",
+    summary="Календарная подписка на расписание группы",
+    description="Лента iCalendar с поддержкой ETag/Last-Modified для календарных приложений")
+def get_group_calendar(group_id: int, request: Request, db: Session = Depends(get_db)):
+    group = db.get(Groups, group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Группа не найдена")
+    return calendar_response(request, db, Schedule.group_id, group_id, f"Расписание {group.name}", group_type=group.type)
+
+@api_router.get("/v1/calendar/teacher/{teacher_id}.ics",
+    summary="Календарная подписка на расписание преподавателя",
+    description="Лента iCalendar с поддержкой ETag/Last-Modified для календарных приложений")
+def get_teacher_calendar(teacher_id: int, request: Request, db: Session = Depends(get_db)):
+    teacher = db.get(Teachers, teacher_id)
+    if not teacher:
+        raise HTTPException(status_code=404, detail="Преподаватель не найден")
+    return calendar_response(request, db, Schedule.teacher_id, teacher_id, f"Расписание {teacher.name}")
+
+@api_router.get("/v1/calendar/room/{room_id}.ics",
+    summary="Календарная подписка на расписание кабинета",
+    description="Лента iCalendar с поддержкой ETag/Last-Modified для календарных приложений")
+def get_room_calendar(room_id: int, request: Request, db: Session = Depends(get_db)):
+    room = db.get(Rooms, room_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Кабинет не найден")
+    return calendar_response(request, db, Schedule.room_id, room_id, f"Кабинет {room.number}")
+
 @api_router.delete("/schedule/{schedule_id}", summary="Удаление занятия из расписания")
 async def delete_schedule(schedule_id: int, db: Session = Depends(get_db)):
     schedule = db.get(Schedule, schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Занятие не найдено")
+    deleted_lesson = (schedule.group_id, schedule.teacher_id, schedule.date, schedule.day_of_week)
+    deleted_entry = occupancy_entry(schedule)
     db.delete(schedule)
+    bump_template_version(db, schedule.template_id)
     db.commit()
+    schedule_cache.invalidate_lesson(*deleted_lesson)
+    occupancy_index.apply_change(db, removed=deleted_entry)
     db.close()
     return {"ok": True}
 
@@ -828,239 +1092,188 @@ async def update_schedule(schedule_id: int, schedule: ScheduleCreate, db: Sessio
     db_schedule = db.get(Schedule, schedule_id)
     if not db_schedule:
         raise HTTPException(status_code=404, detail="Занятие не найдено")
+    if settings.SCHEDULE_CONFLICT_CHECK:
+        conflicts = check_conflicts(db, [schedule], exclude_ids=[schedule_id])
+        if conflicts:
+            return _conflict_response(conflicts)
+    old_template_id = db_schedule.template_id
+    old_lesson = (db_schedule.group_id, db_schedule.teacher_id, db_schedule.date, db_schedule.day_of_week)
+    old_entry = occupancy_entry(db_schedule)
     for field, value in schedule.dict().items():
         setattr(db_schedule, field, value)
+    bump_template_version(db, old_template_id, schedule.template_id)
     db.commit()
+    schedule_cache.invalidate_lesson(*old_lesson)
+    schedule_cache.invalidate_lesson(schedule.group_id, schedule.teacher_id, schedule.date, schedule.day_of_week)
+    occupancy_index.apply_change(db, removed=old_entry, added=occupancy_entry(schedule))
     db.refresh(db_schedule)
     return db_schedule
 
-@api_router.get("/schedule-templates/{template_id}/export_excel", summary="Экспорт расписания в Excel")
-async def export_schedule_excel(template_id: int, db: Session = Depends(get_db)):
-    template = db.query(ScheduleTemplate).filter(ScheduleTemplate.id == template_id).first()
+def _export_busy_response(error: ExportBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(error)},
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def _conflict_response(conflicts: list) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "Преподаватель или кабинет уже заняты в это время", "conflicts": conflicts}
+    )
+
+def _select_templates(
+    db: Session,
+    template_ids: Optional[List[int]] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    group_types: Optional[List[str]] = None
+):
+    """Шаблоны по списку id или по периоду (например, семестру) и типам групп"""
+    query = db.query(ScheduleTemplate)
+    if template_ids:
+        query = query.filter(ScheduleTemplate.id.in_(template_ids))
+    if date_start:
+        query = query.filter(ScheduleTemplate.date_end >= date_start)
+    if date_end:
+        query = query.filter(ScheduleTemplate.date_start <= date_end)
+    if group_types:
+        query = query.filter(ScheduleTemplate.group_type.in_(group_types))
+    return query.order_by(ScheduleTemplate.id)
+
+async def _export_template(db: Session, template_id: int, export_format: str):
+    """Отдает выгрузку шаблона из кэша или готовит ее в пуле процессов"""
+    template = await run_in_threadpool(db.get, ScheduleTemplate, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
-    groups = db.query(Groups).filter(Groups.type == template.group_type).all()
-    lessons = db.query(Schedule).filter(Schedule.template_id == template_id).all()
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Расписание"
-    # Шапка
-    header = ["День", "№ пары", "Над чертой/Под чертой"] + [g.name for g in groups]
-    ws.append(header)
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    thin = Side(border_style="thin", color="000000")
-    fill_gray = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-    fill_blue = PatternFill(start_color="E3F0FF", end_color="E3F0FF", fill_type="solid")
-    # Дни/даты
-    daysOfWeek = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
-    if template.is_full_semester:
-        days = daysOfWeek
-        date_list = [None]*6
-    else:
-        start = template.date_start
-        end = template.date_end
-        days = [(start + timedelta(days=i)).isoformat() for i in range((end-start).days+1)]
-        date_list = [start + timedelta(days=i) for i in range((end-start).days+1)]
-    row_idx = 2
-    day_row_indices = []  # Для объединения ячеек дат
-    for day_idx, day in enumerate(days):
-        day_start_idx = row_idx
-        # Формируем подпись: дата + день недели
-        if template.is_full_semester:
-            date_label = daysOfWeek[day_idx]
-        else:
-            date_label = f"{day}\n{daysOfWeek[day_idx % 6]}"
-        
-        for lesson_num in range(1, 8):
-            # Над чертой
-            row_nad = [date_label if lesson_num == 1 else "", lesson_num, "Над чертой"]
-            # Под чертой
-            row_pod = ["", "", "Под чертой"]
-            for group in groups:
-                # Над чертой
-                if template.is_full_semester:
-                    lessons_nad = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and l.day_of_week==day_idx+1 and l.is_above_line]
-                else:
-                    date_str = days[day_idx]
-                    lessons_nad = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and str(l.date)==date_str and l.is_above_line]
-                cell_nad = ''
-                if lessons_nad:
-                    l = lessons_nad[0]
-                    cell_nad = f"{l.lesson.name}\n{l.teacher.name}\nАуд. {l.room.number}"
-                row_nad.append(cell_nad)
-                # Под чертой
-                if template.is_full_semester:
-                    lessons_pod = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and l.day_of_week==day_idx+1 and not l.is_above_line]
-                else:
-                    date_str = days[day_idx]
-                    lessons_pod = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and str(l.date)==date_str and not l.is_above_line]
-                cell_pod = ''
-                if lessons_pod:
-                    l = lessons_pod[0]
-                    cell_pod = f"{l.lesson.name}\n{l.teacher.name}\nАуд. {l.room.number}"
-                row_pod.append(cell_pod)
-            ws.append(row_nad)
-            ws.append(row_pod)
-            # Объединяем ячейки для номера пары
-            ws.merge_cells(start_row=row_idx, start_column=2, end_row=row_idx+1, end_column=2)
-            # Высота строк (одинаковая)
-            ws.row_dimensions[row_idx].height = 45
-            ws.row_dimensions[row_idx+1].height = 45
-            # Цвет для строки "Под чертой"
-            for col in range(1, 4+len(groups)):
-                ws.cell(row=row_idx+1, column=col).fill = fill_gray
-            # Цвет для "Над чертой" (чередование)
-            if (lesson_num % 2) == 0:
-                for col in range(1, 4+len(groups)):
-                    ws.cell(row=row_idx, column=col).fill = fill_blue
-            row_idx += 2
-        day_end_idx = row_idx - 1
-        day_row_indices.append((day_start_idx, day_end_idx))
-    
-    # Объединяем ячейки для дат
-    for start, end in day_row_indices:
-        ws.merge_cells(start_row=start, start_column=1, end_row=end, end_column=1)
-    
-    # Стилизация
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            cell.alignment = Alignment(wrap_text=True, vertical="center", horizontal="center")
-            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    ws.freeze_panes = ws[2][0]
-    ws.column_dimensions['A'].width = 16
-    ws.column_dimensions['B'].width = 8
-    ws.column_dimensions['C'].width = 16
-    for col in range(4, 4+len(groups)):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 28
-    stream = io.BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    group_type = template.group_type if template.group_type else 'Unknown'
-    date_start = template.date_start.strftime('%Y-%m-%d') if template.date_start else ''
-    date_end = template.date_end.strftime('%Y-%m-%d') if template.date_end else ''
-    file_title = f"Raspisanie_{group_type}_{date_start}_{date_end}.xlsx".replace(' ', '_').replace(':', '')
-    def safe_filename(s):
-        return re.sub(r'[^A-Za-z0-9_.-]', '_', s)
-    filename = safe_filename(file_title)
-    return StreamingResponse(stream, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    # Версия в ключе меняется при любом изменении шаблона, поэтому кэш не устаревает
+    cache_key = export_cache_key(template, export_format)
+    fileobj = await run_in_threadpool(export_cache.get, cache_key)
+    if fileobj is None:
+        try:
+            async with export_slot():
+                # Запросы к БД синхронные, поэтому тоже выполняются вне event loop
+                snapshot = await run_in_threadpool(load_template_snapshot, db, template)
+                path = await run_export(render_export_file, export_format, snapshot)
+        except ExportBusyError as e:
+            return _export_busy_response(e)
+        fileobj = await run_in_threadpool(export_cache.store, cache_key, path)
+    filename = export_filename(template, export_format)
+    return StreamingResponse(
+        iter_file_chunks(fileobj),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@api_router.get("/schedule-templates/{template_id}/export_excel", summary="Экспорт расписания в Excel")
+async def export_schedule_excel(template_id: int, db: Session = Depends(get_db)):
+    return await _export_template(db, template_id, "xlsx")
 
 @api_router.get("/schedule-templates/{template_id}/export_pdf", summary="Экспорт расписания в PDF")
 async def export_schedule_pdf(template_id: int, db: Session = Depends(get_db)):
-    # Регистрируем шрифт DejaVuSans
-    font_path = os.path.join("app", "static", "webfonts", "DejaVuSans.ttf")
-    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-    bold_font_path = os.path.join("app", "static", "webfonts", "DejaVuSans-Bold.ttf")
-    pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", bold_font_path))
-    template = db.query(ScheduleTemplate).filter(ScheduleTemplate.id == template_id).first()
+    return await _export_template(db, template_id, "pdf")
+
+@api_router.get("/export/workbook", summary="Экспорт нескольких шаблонов в одну книгу Excel")
+async def export_workbook(
+    template_ids: Optional[List[int]] = Query(None),
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    group_types: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Один лист на шаблон: данные читаются одним пакетом, листы готовятся параллельно"""
+    if not (template_ids or date_start or date_end):
+        raise HTTPException(status_code=400, detail="Укажите шаблоны или период")
+    selected = await run_in_threadpool(
+        lambda: _select_templates(db, template_ids, date_start, date_end, group_types).all()
+    )
+    if not selected:
+        raise HTTPException(status_code=404, detail="Шаблоны расписания не найдены")
+    try:
+        async with export_slot():
+            snapshots = await run_in_threadpool(load_template_snapshots, db, selected)
+            sheets = await asyncio.gather(*[run_export(build_sheet_data, snapshot) for snapshot in snapshots])
+            path = await run_export(render_workbook_file, sheets)
+    except ExportBusyError as e:
+        return _export_busy_response(e)
+    # Файл удаляется сразу, открытый дескриптор остается доступен до конца отправки
+    fileobj = open(path, "rb")
+    os.unlink(path)
+    period_start = min(t.date_start for t in selected).strftime('%Y-%m-%d')
+    period_end = max(t.date_end for t in selected).strftime('%Y-%m-%d')
+    return StreamingResponse(
+        iter_file_chunks(fileobj),
+        media_type=EXPORT_MEDIA_TYPES["xlsx"],
+        headers={"Content-Disposition": f"attachment; filename=Raspisanie_{period_start}_{period_end}.xlsx"}
+    )
+
+@api_router.get("/schedule-templates/{template_id}/export_csv", summary="Потоковый экспорт занятий шаблона в CSV")
+def export_schedule_csv(template_id: int, db: Session = Depends(get_db)):
+    template = db.get(ScheduleTemplate, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
-    groups = db.query(Groups).filter(Groups.type == template.group_type).all()
-    lessons = db.query(Schedule).filter(Schedule.template_id == template_id).all()
-    daysOfWeek = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
-    header = ["День", "№ пары", "Над чертой/\nПод чертой"] + [g.name for g in groups]
-    data = [header]
-    # Формируем список дней и дат
-    if template.is_full_semester:
-        days = daysOfWeek
-        date_list = [None]*6
-    else:
-        start = template.date_start
-        end = template.date_end
-        days = [(start + timedelta(days=i)).isoformat() for i in range((end-start).days+1)]
-        date_list = [start + timedelta(days=i) for i in range((end-start).days+1)]
-    styleSheet = getSampleStyleSheet()
-    # Формируем строки таблицы
-    day_row_indices = []  # Для объединения ячеек дат
-    def vertical_text(s):
-        return '\n'.join(list(s.replace('-', '–')))
-    for day_idx, day in enumerate(days):
-        day_start_idx = len(data)
-        # Формируем подпись: дата + день недели
-        if template.is_full_semester:
-            date_label = daysOfWeek[day_idx]
-        else:
-            date_label = f"{day}\n{daysOfWeek[day_idx % 6]}"
-        # Вертикальный текст для даты и дня недели
-        date_label_vertical = '\n'.join([vertical_text(part) for part in date_label.split('\n')])
-        for lesson_num in range(1, 8):
-            row_nad = [date_label_vertical if lesson_num == 1 else "", lesson_num, "Над чертой"]
-            row_pod = ["", "", "Под чертой"]
-            for group in groups:
-                # Над чертой
-                if template.is_full_semester:
-                    lessons_nad = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and l.day_of_week==day_idx+1 and l.is_above_line]
-                else:
-                    date_str = days[day_idx]
-                    lessons_nad = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and str(l.date)==date_str and l.is_above_line]
-                cell_nad = ''
-                if lessons_nad:
-                    l = lessons_nad[0]
-                    cell_nad = f"{l.lesson.name}\n{l.teacher.name}\nАуд. {l.room.number}"
-                row_nad.append(cell_nad)
-                # Под чертой
-                if template.is_full_semester:
-                    lessons_pod = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and l.day_of_week==day_idx+1 and not l.is_above_line]
-                else:
-                    date_str = days[day_idx]
-                    lessons_pod = [l for l in lessons if l.group_id==group.id and l.lesson_number==lesson_num and str(l.date)==date_str and not l.is_above_line]
-                cell_pod = ''
-                if lessons_pod:
-                    l = lessons_pod[0]
-                    cell_pod = f"{l.lesson.name}\n{l.teacher.name}\nАуд. {l.room.number}"
-                row_pod.append(cell_pod)
-            data.append(row_nad)
-            data.append(row_pod)
-        day_end_idx = len(data) - 1
-        day_row_indices.append((day_start_idx, day_end_idx))
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=10, leftMargin=10, topMargin=10, bottomMargin=10)
-    styleSheet = getSampleStyleSheet()
-    styleSheet['Title'].fontName = 'DejaVuSans'
-    elements = []
-    # Формируем красивый заголовок и имя файла
-    group_type = template.group_type if template.group_type else 'Unknown'
-    date_start = template.date_start.strftime('%Y-%m-%d') if template.date_start else ''
-    date_end = template.date_end.strftime('%Y-%m-%d') if template.date_end else ''
-    title_text = f"Расписание: {group_type} с {date_start} по {date_end}"
-    file_title = f"Raspisanie_{group_type}_{date_start}_{date_end}.pdf".replace(' ', '_').replace(':', '')
-
-    elements.append(Paragraph(title_text, styleSheet['Title']))
-    elements.append(Spacer(1, 12))
-    # Растянуть таблицу на всю ширину страницы
-    page_width = landscape(A4)[0] - 20  # минус отступы
-    ncols = len(header)
-    # ширина: день, № пары, группы...
-    colWidths = [40, 32, 60] + [(page_width-40-32-60)//(ncols-3)]*(ncols-3)
-    table = Table(data, repeatRows=1, rowHeights=[34]*len(data), colWidths=colWidths)
-    style = TableStyle([
-        ('FONTNAME', (0,0), (-1,-1), 'DejaVuSans'),
-        ('FONTSIZE', (0,0), (-1,-1), 7),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-    ])
-    for i, row in enumerate(data[1:], start=1):
-        if (i % 2) == 0:
-            style.add('BACKGROUND', (0,i), (-1,i), colors.whitesmoke)
-        elif (i % 4) < 2:
-            style.add('BACKGROUND', (0,i), (-1,i), colors.HexColor('#e3f0ff'))
-    for start, end in day_row_indices:
-        style.add('SPAN', (0, start), (0, end))  # дата
-    # Объединение ячеек с номером пары
-    for i in range(1, len(data), 2):
-        style.add('SPAN', (1, i), (1, i+1))
-    table.setStyle(style)
-    elements.append(table)
-    doc.build(elements)
-    buffer.seek(0)
-    def safe_filename(s):
-        return re.sub(r'[^A-Za-z0-9_.-]', '_', s)
-    filename = safe_filename(file_title)
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    filename = export_filename(template, "csv")
+    return StreamingResponse(
+        iter_csv(template_id),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@api_router.get("/schedule-templates/{template_id}/export_ndjson", summary="Потоковый экспорт занятий шаблона в NDJSON")
+def export_schedule_ndjson(template_id: int, db: Session = Depends(get_db)):
+    template = db.get(ScheduleTemplate, template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail="Шаблон расписания не найден")
+    filename = export_filename(template, "ndjson")
+    return StreamingResponse(
+        iter_ndjson(template_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@api_router.post("/export-jobs", response_model=ExportJobResponse, summary="Пакетная выгрузка шаблонов в ZIP")
+def create_export_job(
+    job: ExportJobCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    unknown_formats = set(job.formats) - set(EXPORT_MEDIA_TYPES)
+    if not job.formats or unknown_formats:
+        raise HTTPException(status_code=400, detail="Неизвестный формат выгрузки")
+    query = _select_templates(db, job.template_ids, job.date_start, job.date_end, job.group_types)
+    template_ids = [row.id for row in query.with_entities(ScheduleTemplate.id).all()]
+    if not template_ids:
+        raise HTTPException(status_code=404, detail="Шаблоны расписания не найдены")
+    cleanup_jobs(db)
+    db_job = ExportJob(
+        id=uuid.uuid4().hex,
+        status="pending",
+        params=json.dumps({"template_ids": template_ids, "formats": job.formats}),
+        total=len(template_ids) * len(job.formats),
+        completed=0
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    background_tasks.add_task(run_export_job, db_job.id)
+    return db_job
+
+@api_router.get("/export-jobs/{job_id}", response_model=ExportJobResponse, summary="Статус пакетной выгрузки")
+def get_export_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(ExportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача выгрузки не найдена")
+    expire_job(db, job)
+    return job
+
+@api_router.get("/export-jobs/{job_id}/download", summary="Скачивание архива пакетной выгрузки")
+def download_export_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(ExportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача выгрузки не найдена")
+    if job.status != "done" or not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=409, detail="Архив еще не готов")
+    return FileResponse(job.file_path, media_type="application/zip", filename=f"Raspisanie_{job.id}.zip")
 
 # Todo API endpoints
 @api_router.post("/todos", response_model=TodoResponse, summary="Создание новой задачи")
@@ -1075,8 +1288,15 @@ async def create_todo(todo: TodoCreate, db: Session = Depends(get_db)):
     return db_todo
 
 @api_router.get("/todos", response_model=List[TodoResponse], summary="Получение всех задач")
-async def get_todos(db: Session = Depends(get_db)):
-    todos = db.query(Todo).order_by(Todo.created_at.desc()).all()
+async def get_todos(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    todos, next_cursor = paginate(db.query(Todo), TODO_PAGE_KEY, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return todos
 
 @api_router.get("/todos/{todo_id}", response_model=TodoResponse, summary="Получение конкретной задачи")
@@ -0,0 +1,56 @@
+"""
+Пакетное добавление занятий в расписание.
+Проверки те же, что в create_schedule, но все ссылки проверяются одним
+запросом IN (...) на таблицу, а вставка идет одним executemany в одной
+транзакции.
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate
+
+def _existing(db: Session, model, ids) -> set:
+    return {row.id for row in db.query(model.id).filter(model.id.in_(ids))}
+
+def validate_bulk(db: Session, items) -> list:
+    """Ошибки по элементам: [{"index": i, "detail": ...}], пустой список — все корректно"""
+    templates = {
+        template.id: template
+        for template in db.query(
+            ScheduleTemplate.id, ScheduleTemplate.group_type, ScheduleTemplate.date_start, ScheduleTemplate.date_end
+        ).filter(ScheduleTemplate.id.in_({item.template_id for item in items}))
+    }
+    group_types = dict(db.query(Groups.id, Groups.type).filter(Groups.id.in_({item.group_id for item in items})).all())
+    lessons = _existing(db, Lessons, {item.lesson_id for item in items})
+    teachers = _existing(db, Teachers, {item.teacher_id for item in items})
+    rooms = _existing(db, Rooms, {item.room_id for item in items})
+
+    errors = []
+    for index, item in enumerate(items):
+        template = templates.get(item.template_id)
+        if template is None:
+            detail = "Шаблон расписания не найден"
+        elif not (template.date_start <= item.date <= template.date_end):
+            detail = "Дата выходит за пределы шаблона"
+        elif item.group_id not in group_types:
+            detail = "Группа не найдена"
+        elif group_types[item.group_id] != template.group_type:
+            detail = "Тип группы не соответствует шаблону"
+        elif item.lesson_id not in lessons:
+            detail = "Занятие не найдено"
+        elif item.teacher_id not in teachers:
+            detail = "Преподаватель не найден"
+        elif item.room_id not in rooms:
+            detail = "Кабинет не найден"
+        else:
+            continue
+        errors.append({"index": index, "detail": detail})
+    return errors
+
+def insert_bulk(db: Session, items) -> list:
+    """Вставляет занятия одним executemany и возвращает их id в порядке items (без commit)"""
+    result = db.execute(
+        insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+        [item.dict() for item in items]
+    )
+    return [row.id for row in result]
@@ -0,0 +1,112 @@
+"""
+Кэш ответов /api/v1/schedule для групп и преподавателей.
+Ключ — сущность, период, вид ответа (период или текущая неделя) и ETag
+ответа. ETag собирается из версий шаблонов и справочников в БД, поэтому
+после изменения в любом воркере Gunicorn запрос строит новый ключ и не
+получит устаревший ответ. Сброс записей при изменении (только группы и
+преподавателя занятия, чей период содержит его дату; при изменении
+справочников — весь кэш) лишь освобождает память раньше вытеснения по LRU
+и SCHEDULE_CACHE_TTL.
+"""
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+import threading
+import time
+import sys
+import os
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+
+class ScheduleCache:
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # ключ -> (момент устаревания, ответ)
+        self._items = OrderedDict()
+        # (вид сущности, id) -> ключи ее записей
+        self._by_entity = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(kind: str, entity_id: int, date_start: date, date_end: date, variant: str = "period", etag: str = "") -> tuple:
+        return (kind, entity_id, date_start, date_end, variant, etag)
+
+    def get(self, key: tuple):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: tuple, value):
+        with self._lock:
+            if key in self._items:
+                self._discard(key)
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._by_entity.setdefault(key[:2], set()).add(key)
+            while len(self._items) > self.max_entries:
+                self._discard(next(iter(self._items)))
+
+    def invalidate(self, kind: str, entity_id: int, date_start: Optional[date] = None, date_end: Optional[date] = None):
+        """
+        Сбрасывает записи сущности, период которых пересекается с [date_start, date_end].
+        Без дат сбрасываются все записи сущности.
+        """
+        with self._lock:
+            for key in list(self._by_entity.get((kind, entity_id), ())):
+                start, end = key[2:4]
+                if date_start is not None and end < date_start:
+                    continue
+                if date_end is not None and start > date_end:
+                    continue
+                self._discard(key)
+                self.invalidations += 1
+
+    def invalidate_lesson(self, group_id: int, teacher_id: int, day: Optional[date] = None, day_of_week: Optional[int] = None):
+        """
+        Занятие группы и преподавателя на дату day добавлено, изменено или удалено.
+        Еженедельное занятие (day_of_week) попадает во все периоды, поэтому сбрасываются все записи.
+        """
+        if day_of_week is not None:
+            day = None
+        self.invalidate("group", group_id, day, day)
+        self.invalidate("teacher", teacher_id, day, day)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._items)
+            self._items.clear()
+            self._by_entity.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations
+            }
+
+    def _discard(self, key: tuple):
+        del self._items[key]
+        keys = self._by_entity.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_entity[key[:2]]
+
+schedule_cache = ScheduleCache(settings.SCHEDULE_CACHE_MAX_ENTRIES, settings.SCHEDULE_CACHE_TTL)
@@ -0,0 +1,180 @@
+"""
+Занятия группы или преподавателя для /api/v1/schedule и быстрый путь /api/schedules.
+Один SELECT нужных колонок с join'ами вместо ORM-объектов Schedule,
+у которых обращение к lesson/teacher/room/group догружалось бы
+отдельными запросами; ответ собирается прямо из кортежей.
+Еженедельные занятия шаблонов на весь семестр добавляются с конкретными
+датами периода (см. recurrence.py).
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, aliased
+
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate
+from app.api.recurrence import LessonRow, lesson_rows_query, resolve_lessons
+
+def _lessons_query(db: Session, column, entity_id: int, date_start: date, date_end: date, ordered: bool):
+    query = lesson_rows_query(db).filter(
+        column == entity_id,
+        Schedule.date >= date_start,
+        Schedule.date <= date_end
+    )
+    if ordered:
+        query = query.order_by(Schedule.date, Schedule.lesson_number)
+    return query
+
+def _group_lesson(row: LessonRow, day: str) -> dict:
+    return {
+        "date": day,
+        "day_of_week": row.day_of_week,
+        "lesson_number": row.lesson_number,
+        "lesson": {"id": row.lesson_id, "name": row.lesson_name},
+        "teacher": {"id": row.teacher_id, "name": row.teacher_name},
+        "room": {"id": row.room_id, "number": row.room_number},
+        "is_above_line": row.is_above_line,
+        "lesson_type": row.lesson_type
+    }
+
+def _teacher_lesson(row: LessonRow, day: str) -> dict:
+    return {
+        "date": day,
+        "day_of_week": row.day_of_week,
+        "lesson_number": row.lesson_number,
+        "lesson": {"id": row.lesson_id, "name": row.lesson_name},
+        "group": {"id": row.group_id, "name": row.group_name, "type": row.group_type},
+        "room": {"id": row.room_id, "number": row.room_number},
+        "is_above_line": row.is_above_line,
+        "lesson_type": row.lesson_type
+    }
+
+def group_lessons(db: Session, group_id: int, date_start: date, date_end: date, ordered: bool = False) -> list:
+    """Занятия группы за период в формате ответа v1, включая развернутые еженедельные"""
+    rows = resolve_lessons(
+        db, _lessons_query(db, Schedule.group_id, group_id, date_start, date_end, ordered),
+        date_start, date_end, group_ids=[group_id]
+    )
+    return [_group_lesson(row, row.date.isoformat()) for row in rows]
+
+def teacher_lessons(db: Session, teacher_id: int, date_start: date, date_end: date, ordered: bool = False) -> list:
+    """Занятия преподавателя за период в формате ответа v1, включая развернутые еженедельные"""
+    rows = resolve_lessons(
+        db, _lessons_query(db, Schedule.teacher_id, teacher_id, date_start, date_end, ordered),
+        date_start, date_end, teacher_ids=[teacher_id]
+    )
+    return [_teacher_lesson(row, row.date.isoformat()) for row in rows]
+
+def schedule_details_query(db: Session, template_id: Optional[int] = None):
+    """Кортежи всех полей ScheduleWithDetails одним запросом без ORM-объектов"""
+    LessonTeacher = aliased(Teachers)
+    query = db.query(
+        Schedule.id, Schedule.template_id, Schedule.date, Schedule.group_id, Schedule.lesson_id,
+        Schedule.teacher_id, Schedule.room_id, Schedule.lesson_number, Schedule.is_above_line,
+        Schedule.lesson_type, Schedule.day_of_week,
+        Lessons.name, LessonTeacher.id, LessonTeacher.name, LessonTeacher.description,
+        Teachers.name, Teachers.description,
+        Rooms.number, Rooms.capacity, Rooms.description,
+        Groups.name, Groups.type, Groups.description,
+        ScheduleTemplate.name, ScheduleTemplate.date_start, ScheduleTemplate.date_end,
+        ScheduleTemplate.group_type, ScheduleTemplate.schedule_type, ScheduleTemplate.is_full_semester
+    ).join(
+        Lessons, Schedule.lesson_id == Lessons.id
+    ).join(
+        Teachers, Schedule.teacher_id == Teachers.id
+    ).join(
+        Rooms, Schedule.room_id == Rooms.id
+    ).join(
+        Groups, Schedule.group_id == Groups.id
+    ).join(
+        ScheduleTemplate, Schedule.template_id == ScheduleTemplate.id
+    ).outerjoin(
+        LessonTeacher, Lessons.teacher_id == LessonTeacher.id
+    )
+    if template_id:
+        query = query.filter(Schedule.template_id == template_id)
+    return query
+
+def schedule_details(rows) -> list:
+    """
+    Строки schedule_details_query в формате ScheduleWithDetails.
+    Используется быстрым путем /api/schedules (см. fast_json.py).
+    """
+    result = []
+    # Шаблон у всех занятий обычно один: его словарь собирается один раз
+    templates = {}
+    for (schedule_id, schedule_template_id, day, group_id, lesson_id, teacher_id, room_id, lesson_number,
+         is_above_line, lesson_type, day_of_week,
+         lesson_name, lesson_teacher_id, lesson_teacher_name, lesson_teacher_description,
+         teacher_name, teacher_description,
+         room_number, room_capacity, room_description,
+         group_name, group_type, group_description,
+         *template_fields) in rows:
+        template = templates.get(schedule_template_id)
+        if template is None:
+            name, date_start, date_end, template_group_type, schedule_type, is_full_semester = template_fields
+            template = templates[schedule_template_id] = {
+                "name": name,
+                "date_start": date_start,
+                "date_end": date_end,
+                "group_type": template_group_type,
+                "schedule_type": schedule_type,
+                "is_full_semester": bool(is_full_semester),
+                "id": schedule_template_id
+            }
+        result.append({
+            "template_id": schedule_template_id,
+            "date": day,
+            "group_id": group_id,
+            "lesson_id": lesson_id,
+            "teacher_id": teacher_id,
+            "room_id": room_id,
+            "lesson_number": lesson_number,
+            "is_above_line": is_above_line,
+            "lesson_type": lesson_type,
+            "day_of_week": day_of_week,
+            "id": schedule_id,
+            "lesson": {
+                "id": lesson_id,
+                "name": lesson_name,
+                "teacher": {
+                    "id": lesson_teacher_id,
+                    "name": lesson_teacher_name,
+                    "description": lesson_teacher_description
+                } if lesson_teacher_id is not None else None
+            },
+            "teacher": {"id": teacher_id, "name": teacher_name, "description": teacher_description},
+            "room": {"id": room_id, "number": room_number, "capacity": room_capacity, "description": room_description},
+            "group": {"id": group_id, "name": group_name, "type": group_type, "description": group_description},
+            "template": template
+        })
+    return result
+
+def batch_lessons(db: Session, group_ids, teacher_ids, date_start: date, date_end: date):
+    """
+    Занятия нескольких групп и преподавателей за период одним запросом с IN (...).
+    Возвращает два словаря id -> занятия в формате ответов v1 для группы и преподавателя.
+    """
+    by_group = {group_id: [] for group_id in group_ids}
+    by_teacher = {teacher_id: [] for teacher_id in teacher_ids}
+    conditions = []
+    if by_group:
+        conditions.append(Schedule.group_id.in_(list(by_group)))
+    if by_teacher:
+        conditions.append(Schedule.teacher_id.in_(list(by_teacher)))
+    if not conditions:
+        return by_group, by_teacher
+    query = lesson_rows_query(db).filter(
+        or_(*conditions),
+        Schedule.date >= date_start,
+        Schedule.date <= date_end
+    ).order_by(
+        Schedule.date, Schedule.lesson_number
+    )
+    for row in resolve_lessons(db, query, date_start, date_end, group_ids=list(by_group), teacher_ids=list(by_teacher)):
+        day = row.date.isoformat()
+        if row.group_id in by_group:
+            by_group[row.group_id].append(_group_lesson(row, day))
+        if row.teacher_id in by_teacher:
+            by_teacher[row.teacher_id].append(_teacher_lesson(row, day))
+    return by_group, by_teacher
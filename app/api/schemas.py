@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Base schemas for related models
 class TeacherBase(BaseModel):
@@ -47,6 +47,19 @@ class ScheduleTemplateResponse(ScheduleTemplateBase):
     class Config:
         from_attributes = True
 
+class ScheduleTemplateClone(BaseModel):
+    name: str
+    date_start: date
+    # По умолчанию — период той же длины, что у исходного шаблона
+    date_end: Optional[date] = None
+    group_type: Optional[str] = None
+    # id группы исходного шаблона -> id группы копии (при смене типа групп)
+    group_map: Dict[int, int] = {}
+
+class ScheduleTemplateCloneResponse(BaseModel):
+    template: ScheduleTemplateResponse
+    copied: int
+
 # Schedule schemas
 class ScheduleBase(BaseModel):
     template_id: int
@@ -63,6 +76,13 @@ class ScheduleBase(BaseModel):
 class ScheduleCreate(ScheduleBase):
     pass
 
+class ScheduleBulkCreate(BaseModel):
+    items: List[ScheduleCreate]
+
+class ScheduleBulkResponse(BaseModel):
+    created: int
+    ids: List[int]
+
 class ScheduleResponse(ScheduleBase):
     id: int
 
@@ -207,3 +227,23 @@ class TodoResponse(TodoBase):
 
     class Config:
         from_attributes = True
+
+# Export job schemas
+class ExportJobCreate(BaseModel):
+    template_ids: Optional[List[int]] = None
+    date_start: Optional[date] = None
+    date_end: Optional[date] = None
+    group_types: Optional[List[str]] = None
+    formats: List[str] = ["xlsx", "pdf"]
+
+class ExportJobResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    completed: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,69 @@
+"""
+Загрузка данных шаблона расписания в виде простого снимка для экспорта.
+Число запросов не зависит от размера шаблона: группы и занятия читаются
+двумя запросами, названия предметов, преподавателей и кабинетов
+подтягиваются join'ами без загрузки ORM-объектов.
+"""
+from sqlalchemy.orm import Session
+
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate
+from app.api.export import ExportTemplate, ExportGroup, ExportLesson, ExportSnapshot
+
+def export_lessons_query(db: Session):
+    """Занятия с названиями в виде кортежей в порядке полей ExportLesson"""
+    return db.query(
+        Schedule.group_id,
+        Schedule.lesson_number,
+        Schedule.date,
+        Schedule.day_of_week,
+        Schedule.is_above_line,
+        Lessons.name,
+        Teachers.name,
+        Rooms.number
+    ).join(
+        Lessons, Schedule.lesson_id == Lessons.id
+    ).join(
+        Teachers, Schedule.teacher_id == Teachers.id
+    ).join(
+        Rooms, Schedule.room_id == Rooms.id
+    )
+
+def _export_template(template: ScheduleTemplate) -> ExportTemplate:
+    return ExportTemplate(
+        id=template.id,
+        name=template.name,
+        group_type=template.group_type,
+        date_start=template.date_start,
+        date_end=template.date_end,
+        is_full_semester=bool(template.is_full_semester)
+    )
+
+def load_template_snapshots(db: Session, templates) -> list:
+    """
+    Снимки нескольких уже загруженных шаблонов: один запрос на группы всех
+    нужных типов и один на занятия всех шаблонов, независимо от их числа.
+    """
+    groups_by_type = {}
+    group_rows = db.query(Groups.type, Groups.id, Groups.name).filter(
+        Groups.type.in_(list({template.group_type for template in templates}))
+    ).order_by(Groups.id)
+    for group_type, group_id, name in group_rows:
+        groups_by_type.setdefault(group_type, []).append(ExportGroup(id=group_id, name=name))
+    lessons_by_template = {template.id: [] for template in templates}
+    lesson_rows = export_lessons_query(db).add_columns(Schedule.template_id).filter(
+        Schedule.template_id.in_(list(lessons_by_template))
+    ).order_by(Schedule.id)
+    for row in lesson_rows:
+        lessons_by_template[row[-1]].append(ExportLesson._make(row[:-1]))
+    return [
+        ExportSnapshot(
+            template=_export_template(template),
+            groups=groups_by_type.get(template.group_type, []),
+            lessons=lessons_by_template[template.id]
+        )
+        for template in templates
+    ]
+
+def load_template_snapshot(db: Session, template: ScheduleTemplate) -> ExportSnapshot:
+    """Снимок уже загруженного шаблона: два запроса независимо от числа занятий"""
+    return load_template_snapshots(db, [template])[0]
@@ -0,0 +1,96 @@
+"""
+Потоковая выгрузка занятий шаблона в CSV и NDJSON.
+Строки читаются серверным курсором пачками по STREAM_BATCH_SIZE и сразу
+уходят клиенту, поэтому весь результат никогда не держится в памяти.
+"""
+import csv
+import io
+import json
+
+from app.api.database import SessionLocal
+from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule
+
+STREAM_BATCH_SIZE = 1000
+
+STREAM_FIELDS = [
+    "id", "template_id", "date", "day_of_week", "lesson_number", "is_above_line", "lesson_type",
+    "group_id", "group_name", "lesson_id", "lesson_name",
+    "teacher_id", "teacher_name", "room_id", "room_number"
+]
+
+def iter_schedule_rows(template_id: int):
+    """
+    Кортежи занятий шаблона в порядке STREAM_FIELDS.
+    Генератор открывает свою сессию: он работает, пока отправляется ответ,
+    когда сессия из зависимости get_db уже может быть закрыта.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(
+            Schedule.id,
+            Schedule.template_id,
+            Schedule.date,
+            Schedule.day_of_week,
+            Schedule.lesson_number,
+            Schedule.is_above_line,
+            Schedule.lesson_type,
+            Schedule.group_id,
+            Groups.name,
+            Schedule.lesson_id,
+            Lessons.name,
+            Schedule.teacher_id,
+            Teachers.name,
+            Schedule.room_id,
+            Rooms.number
+        ).outerjoin(
+            Groups, Schedule.group_id == Groups.id
+        ).outerjoin(
+            Lessons, Schedule.lesson_id == Lessons.id
+        ).outerjoin(
+            Teachers, Schedule.teacher_id == Teachers.id
+        ).outerjoin(
+            Rooms, Schedule.room_id == Rooms.id
+        ).filter(
+            Schedule.template_id == template_id
+        ).order_by(
+            Schedule.date, Schedule.lesson_number, Schedule.id
+        )
+        # yield_per включает stream_results: PostgreSQL отдает строки серверным курсором
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield row
+    finally:
+        db.close()
+
+def _batched(rows, size: int = STREAM_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_csv(template_id: int):
+    """CSV с заголовком, кусками по STREAM_BATCH_SIZE строк"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STREAM_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+    for batch in _batched(iter_schedule_rows(template_id)):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            writer.writerow([value.isoformat() if hasattr(value, "isoformat") else value for value in row])
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_ndjson(template_id: int):
+    """Один JSON-объект на строку, кусками по STREAM_BATCH_SIZE строк"""
+    for batch in _batched(iter_schedule_rows(template_id)):
+        lines = []
+        for row in batch:
+            item = dict(zip(STREAM_FIELDS, row))
+            if item["date"] is not None:
+                item["date"] = item["date"].isoformat()
+            lines.append(json.dumps(item, ensure_ascii=False))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,115 @@
+"""
+Копирование шаблона расписания со всеми занятиями в новый период.
+Занятия копируются одним INSERT ... SELECT внутри базы: новые даты и
+группы подставляются выражениями CASE по отображениям, вычисленным
+заранее (различных дат и групп в шаблоне немного), поэтому строки
+занятий не проходят через Python.
+Даты сдвигаются на целое число недель, чтобы занятия не меняли день
+недели: начало копии обычного шаблона должно приходиться на тот же день
+недели, а у расписания на весь семестр сдвиг округляется до недель. У
+еженедельных занятий сохраняется day_of_week, а дата лишь остается внутри
+нового периода; занятия на дату, выпавшие за новый период, не копируются.
+"""
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import case, false, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.api.models import Groups, Schedule, ScheduleTemplate
+
+def _group_mapping(db: Session, template, group_type: str, group_map: dict) -> dict:
+    """Отображение групп шаблона в группы нового типа; без смены типа — пустое"""
+    if group_type == template.group_type and not group_map:
+        return {}
+    used = [group_id for (group_id,) in db.query(Schedule.group_id).filter(
+        Schedule.template_id == template.id
+    ).distinct()]
+    mapping = {group_id: group_map.get(group_id, group_id) for group_id in used}
+    types = dict(db.query(Groups.id, Groups.type).filter(Groups.id.in_(set(mapping.values()))).all())
+    for group_id, new_group_id in mapping.items():
+        if new_group_id not in types:
+            raise HTTPException(status_code=400, detail=f"Группа {new_group_id} не найдена")
+        if types[new_group_id] != group_type:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Группе {group_id} не задана группа типа {group_type}"
+            )
+    return {group_id: new_group_id for group_id, new_group_id in mapping.items() if group_id != new_group_id}
+
+def clone_template(db: Session, template, clone) -> tuple:
+    """
+    Создает копию шаблона по схеме ScheduleTemplateClone (без commit).
+    Возвращает новый шаблон и число скопированных занятий.
+    """
+    date_end = clone.date_end or clone.date_start + (template.date_end - template.date_start)
+    if date_end < clone.date_start:
+        raise HTTPException(status_code=400, detail="Дата окончания раньше даты начала")
+    if not template.is_full_semester and clone.date_start.isoweekday() != template.date_start.isoweekday():
+        raise HTTPException(
+            status_code=400,
+            detail="Начало копии должно приходиться на тот же день недели, что и начало шаблона"
+        )
+    group_type = clone.group_type or template.group_type
+    if db.query(ScheduleTemplate.id).filter(ScheduleTemplate.name == clone.name).first():
+        raise HTTPException(status_code=400, detail="Шаблон с таким именем уже существует")
+    # Та же проверка, что в create_schedule_template
+    existing_template = db.query(ScheduleTemplate.id).filter(
+        ScheduleTemplate.group_type == group_type,
+        ScheduleTemplate.date_start <= date_end,
+        ScheduleTemplate.date_end >= clone.date_start
+    ).first()
+    if existing_template:
+        raise HTTPException(
+            status_code=400,
+            detail="Для данного типа группы уже существует расписание в указанный период"
+        )
+    group_mapping = _group_mapping(db, template, group_type, clone.group_map)
+
+    db_template = ScheduleTemplate(
+        name=clone.name,
+        group_type=group_type,
+        date_start=clone.date_start,
+        date_end=date_end,
+        schedule_type=template.schedule_type,
+        is_full_semester=template.is_full_semester,
+        description=template.description
+    )
+    db.add(db_template)
+    db.flush()
+
+    offset = timedelta(weeks=round((clone.date_start - template.date_start).days / 7))
+    source = Schedule.template_id == template.id
+    weekly = Schedule.day_of_week.isnot(None) if template.is_full_semester else false()
+
+    def source_days(condition) -> list:
+        return [day for (day,) in db.query(Schedule.date).filter(source, condition).distinct()]
+
+    dated_mapping = {day: day + offset for day in source_days(~weekly) if clone.date_start <= day + offset <= date_end}
+    weekly_mapping = {}
+    if template.is_full_semester:
+        # Дата еженедельного занятия условная: главное — остаться в пределах периода
+        weekly_mapping = {day: min(max(day + offset, clone.date_start), date_end) for day in source_days(weekly)}
+    if not dated_mapping and not weekly_mapping:
+        return db_template, 0
+    date_column = case(dated_mapping, value=Schedule.date) if dated_mapping else Schedule.date
+    if weekly_mapping:
+        date_column = case((weekly, case(weekly_mapping, value=Schedule.date)), else_=date_column)
+    source = source & or_(weekly, Schedule.date.in_(list(dated_mapping)))
+
+    group_column = Schedule.group_id
+    if group_mapping:
+        group_column = case(group_mapping, value=Schedule.group_id, else_=Schedule.group_id)
+    columns = (
+        Schedule.template_id, Schedule.date, Schedule.group_id, Schedule.lesson_id, Schedule.teacher_id,
+        Schedule.room_id, Schedule.lesson_number, Schedule.is_above_line, Schedule.lesson_type, Schedule.day_of_week
+    )
+    rows = select(
+        literal(db_template.id),
+        date_column,
+        group_column,
+        Schedule.lesson_id, Schedule.teacher_id, Schedule.room_id, Schedule.lesson_number,
+        Schedule.is_above_line, Schedule.lesson_type, Schedule.day_of_week
+    ).where(source)
+    result = db.execute(insert(Schedule).from_select([column.key for column in columns], rows))
+    return db_template, result.rowcount
@@ -0,0 +1,87 @@
+"""
+Версии содержимого шаблонов расписания.
+Версия хранится в schedule_templates.version и увеличивается одним UPDATE
+в той же транзакции, что и изменение, поэтому видна всем воркерам сразу
+после commit. Так же ведутся версии справочников в таблице table_versions.
+Функции bump_* нужно вызывать до db.commit().
+"""
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.api.models import Schedule, ScheduleTemplate, TableVersion
+from app.api.http_cache import make_etag
+
+REFERENCE_TABLES = ("groups", "teachers", "lessons", "rooms")
+# Ответы с занятиями зависят от справочников и от списка шаблонов
+SCHEDULE_TABLES = REFERENCE_TABLES + ("schedule_templates",)
+
+def _bump(db: Session, condition):
+    db.query(ScheduleTemplate).filter(condition).update(
+        {
+            ScheduleTemplate.version: ScheduleTemplate.version + 1,
+            ScheduleTemplate.updated_at: datetime.utcnow()
+        },
+        synchronize_session=False
+    )
+
+def bump_template_version(db: Session, *template_ids: int):
+    """Шаблоны с указанными id изменились"""
+    ids = {template_id for template_id in template_ids if template_id is not None}
+    if ids:
+        _bump(db, ScheduleTemplate.id.in_(ids))
+
+def bump_group_type_versions(db: Session, *group_types: str):
+    """Изменился состав групп указанных типов (колонки выгрузки)"""
+    types = {group_type for group_type in group_types if group_type is not None}
+    if types:
+        _bump(db, ScheduleTemplate.group_type.in_(types))
+
+def bump_templates_using(db: Session, column, value):
+    """
+    Изменился справочник (преподаватель, предмет, кабинет), на который
+    ссылаются занятия: обновляем версии шаблонов, где он используется.
+    """
+    used_in = db.query(Schedule.template_id).filter(column == value)
+    _bump(db, ScheduleTemplate.id.in_(used_in))
+
+def bump_table_versions(db: Session, *tables: str):
+    """
+    Изменилась таблица-справочник (groups, teachers, lessons, rooms)
+    или список шаблонов (schedule_templates).
+    """
+    names = set(tables)
+    updated = db.query(TableVersion).filter(TableVersion.name.in_(names)).update(
+        {TableVersion.version: TableVersion.version + 1, TableVersion.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    if updated < len(names):
+        # Строки еще нет (база создана через create_all, а не миграцией)
+        existing = {row.name for row in db.query(TableVersion.name).filter(TableVersion.name.in_(names))}
+        db.add_all(TableVersion(name=name, version=1, updated_at=datetime.utcnow()) for name in names - existing)
+
+def table_versions(db: Session, tables=REFERENCE_TABLES) -> str:
+    rows = dict(db.query(TableVersion.name, TableVersion.version).filter(TableVersion.name.in_(tables)).all())
+    return ";".join(f"{name}:{rows.get(name, 0)}" for name in tables)
+
+def schedule_etag(
+    db: Session,
+    *parts,
+    tables=SCHEDULE_TABLES,
+    template_id: Optional[int] = None,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None
+) -> str:
+    """
+    ETag ответа с занятиями из версий подходящих шаблонов и справочников.
+    Таблица schedules не читается, поэтому 304 обходится в два легких запроса.
+    """
+    query = db.query(ScheduleTemplate.id, ScheduleTemplate.version)
+    if template_id is not None:
+        query = query.filter(ScheduleTemplate.id == template_id)
+    if date_start is not None:
+        query = query.filter(ScheduleTemplate.date_end >= date_start)
+    if date_end is not None:
+        query = query.filter(ScheduleTemplate.date_start <= date_end)
+    templates = ";".join(f"{row.id}:{row.version}" for row in query.order_by(ScheduleTemplate.id))
+    return make_etag(*parts, templates, table_versions(db, tables))
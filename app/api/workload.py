@@ -0,0 +1,206 @@
+"""
+Нагрузка преподавателей: число пар и часов по неделям, месяцам или
+шаблонам с разбивкой по типу занятия.
+Пара — ячейка (преподаватель, день, номер пары, над чертой): потоковое
+занятие нескольких групп считается один раз. Занятия на дату считаются в
+SQL (GROUP BY по преподавателю, типу и периоду); пара из нескольких
+шаблонов (поток групп разных типов) относится к шаблону с меньшим id.
+Расписание на весь семестр разворачивается в даты периода шаблона через
+recurrence.py, поэтому еженедельные занятия, перекрытые занятиями группы
+на дату, не считаются, а строки без day_of_week считаются как занятия на
+дату. Итоги еженедельных занятий шаблона по периодам кэшируются в памяти
+воркера (LRU на WORKLOAD_CACHE_MAX_ENTRIES записей) до изменения его версии
+и версий пересекающихся шаблонов, где могут быть замены.
+"""
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from typing import Optional
+import threading
+import sys
+import os
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config import settings
+from app.api.models import Teachers, Schedule, ScheduleTemplate
+from app.api.recurrence import occurrences, drop_overridden, is_dated
+
+WORKLOAD_PERIODS = ("week", "month", "template")
+
+# (template_id, ключ версии, период, начало, конец) -> {(teacher_id, ключ периода, тип): число пар}
+_weekly_cache = OrderedDict()
+_weekly_lock = threading.Lock()
+
+def _period_start(period: str, day: date) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def _next_period(period: str, start: date) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+def _period_label(period: str, start: date) -> str:
+    return start.isoformat() if period == "week" else start.strftime("%Y-%m")
+
+def _period_key(period: str, day: date, template) -> tuple:
+    """Ключ периода; первый элемент задает порядок периодов в ответе"""
+    if period == "template":
+        return (template.date_start.isoformat(), template.id, template.name)
+    return (_period_label(period, _period_start(period, day)),)
+
+def _period_column(period: str, day_column, date_start: date, date_end: date):
+    """
+    Выражение SQL с подписью недели или месяца даты занятия: CASE по границам
+    периодов, одинаковый для SQLite и PostgreSQL.
+    """
+    whens = []
+    start = _period_start(period, date_start)
+    while start <= date_end:
+        following = _next_period(period, start)
+        whens.append((day_column < following, _period_label(period, start)))
+        start = following
+    return case(*whens, else_=None)
+
+def _dated_totals(db: Session, templates, date_start: date, date_end: date, period: str, teacher_ids) -> dict:
+    """Пары занятий на дату: {(teacher_id, ключ периода, тип): число пар}"""
+    slots = db.query(
+        Schedule.teacher_id, Schedule.lesson_type, Schedule.date, Schedule.lesson_number, Schedule.is_above_line,
+        func.min(Schedule.template_id).label("template_id")
+    ).join(
+        ScheduleTemplate, Schedule.template_id == ScheduleTemplate.id
+    ).filter(
+        Schedule.template_id.in_(list(templates)),
+        Schedule.date >= date_start,
+        Schedule.date <= date_end,
+        is_dated()
+    )
+    if teacher_ids:
+        slots = slots.filter(Schedule.teacher_id.in_(list(teacher_ids)))
+    slots = slots.group_by(
+        Schedule.teacher_id, Schedule.lesson_type, Schedule.date, Schedule.lesson_number, Schedule.is_above_line
+    ).subquery()
+    if period == "template":
+        period_column = slots.c.template_id
+    else:
+        period_column = _period_column(period, slots.c.date, date_start, date_end)
+    rows = db.query(
+        slots.c.teacher_id, period_column, slots.c.lesson_type, func.count()
+    ).group_by(slots.c.teacher_id, period_column, slots.c.lesson_type)
+    totals = {}
+    for teacher_id, period_value, lesson_type, count in rows:
+        if period == "template":
+            key = _period_key(period, None, templates[period_value])
+        else:
+            key = (period_value,)
+        totals[(teacher_id, key, lesson_type or "")] = count
+    return totals
+
+def _version_key(db: Session, template) -> tuple:
+    # Замены еженедельных занятий могут лежать в других шаблонах того же периода
+    overlapping = db.query(ScheduleTemplate.id, ScheduleTemplate.version).filter(
+        ScheduleTemplate.id != template.id,
+        ScheduleTemplate.date_start <= template.date_end,
+        ScheduleTemplate.date_end >= template.date_start
+    ).order_by(ScheduleTemplate.id)
+    return (template.version, tuple(tuple(row) for row in overlapping))
+
+def _weekly_totals(db: Session, template, date_start: date, date_end: date, period: str) -> dict:
+    """
+    Пары еженедельных занятий шаблона на весь семестр за период:
+    {(teacher_id, ключ периода, тип): число пар}, с кэшем по версиям.
+    """
+    start, end = max(date_start, template.date_start), min(date_end, template.date_end)
+    key = (template.id, _version_key(db, template), period, start, end)
+    with _weekly_lock:
+        cached = _weekly_cache.get(key)
+        if cached is not None:
+            _weekly_cache.move_to_end(key)
+            return cached
+    rows = drop_overridden(db, occurrences(db, [template], start, end), start, end)
+    slots = {}
+    for row in rows:
+        slots.setdefault((row.teacher_id, row.date, row.lesson_number, bool(row.is_above_line)), row.lesson_type)
+    totals = defaultdict(int)
+    for (teacher_id, day, _, _), lesson_type in slots.items():
+        totals[(teacher_id, _period_key(period, day, template), lesson_type or "")] += 1
+    totals = dict(totals)
+    with _weekly_lock:
+        _weekly_cache[key] = totals
+        while len(_weekly_cache) > settings.WORKLOAD_CACHE_MAX_ENTRIES:
+            _weekly_cache.popitem(last=False)
+    return totals
+
+def _summary(lessons: int, by_type: dict) -> dict:
+    hours = settings.WORKLOAD_HOURS_PER_LESSON
+    return {
+        "lessons": lessons,
+        "hours": lessons * hours,
+        "by_type": {
+            lesson_type: {"lessons": count, "hours": count * hours}
+            for lesson_type, count in sorted(by_type.items())
+        }
+    }
+
+def teacher_workload(
+    db: Session,
+    date_start: Optional[date] = None,
+    date_end: Optional[date] = None,
+    period: str = "week",
+    teacher_ids=None
+) -> list:
+    """Нагрузка всех (или указанных) преподавателей за период"""
+    query = db.query(
+        ScheduleTemplate.id, ScheduleTemplate.name, ScheduleTemplate.version,
+        ScheduleTemplate.date_start, ScheduleTemplate.date_end, ScheduleTemplate.is_full_semester
+    )
+    if date_start is not None:
+        query = query.filter(ScheduleTemplate.date_end >= date_start)
+    if date_end is not None:
+        query = query.filter(ScheduleTemplate.date_start <= date_end)
+    templates = {template.id: template for template in query.order_by(ScheduleTemplate.id)}
+    if not templates:
+        return []
+    if date_start is None:
+        date_start = min(template.date_start for template in templates.values())
+    if date_end is None:
+        date_end = max(template.date_end for template in templates.values())
+    wanted = set(teacher_ids) if teacher_ids else None
+
+    # teacher_id -> период -> тип -> число пар
+    totals = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    parts = [_dated_totals(db, templates, date_start, date_end, period, wanted)]
+    parts.extend(
+        _weekly_totals(db, template, date_start, date_end, period)
+        for template in templates.values() if template.is_full_semester
+    )
+    for part in parts:
+        for (teacher_id, key, lesson_type), count in part.items():
+            if wanted is None or teacher_id in wanted:
+                totals[teacher_id][key][lesson_type] += count
+
+    names = dict(db.query(Teachers.id, Teachers.name).filter(Teachers.id.in_(list(totals))).all()) if totals else {}
+    result = []
+    for teacher_id in sorted(totals, key=lambda teacher_id: (names.get(teacher_id) or "", teacher_id)):
+        teacher_total = defaultdict(int)
+        periods = []
+        for key, by_type in sorted(totals[teacher_id].items()):
+            for lesson_type, count in by_type.items():
+                teacher_total[lesson_type] += count
+            if period == "template":
+                entry = {"period": key[2], "template_id": key[1]}
+            else:
+                entry = {"period": key[0]}
+            entry.update(_summary(sum(by_type.values()), by_type))
+            periods.append(entry)
+        result.append({
+            "teacher": {"id": teacher_id, "name": names.get(teacher_id)},
+            "total": _summary(sum(teacher_total.values()), teacher_total),
+            "periods": periods
+        })
+    return result
@@ -11,7 +11,10 @@ from app.api.auth import get_current_user, get_current_active_user
 from app.api.schemas import UserResponse
 from app.api.database import get_db
 from app.api.middleware import auth_middleware, template_middleware
+from app.api.executor import shutdown_executor
+from app.api.changes import compact_periodically
 from typing import Optional
+import asyncio
 import logging
 import sys
 import os
@@ -61,6 +64,21 @@ app.include_router(html_router)  # HTML маршруты без префикса
 app.include_router(api_router)   # API маршруты с префиксом /api
 app.include_router(health_router)  # Health check маршруты
 
+_background_tasks = []
+
+@app.on_event("startup")
+async def on_startup():
+    """Запускаем фоновое сжатие журнала изменений (0 — сжатие только скриптом compact_changes.py)"""
+    if settings.CHANGE_LOG_COMPACT_INTERVAL > 0:
+        _background_tasks.append(asyncio.create_task(compact_periodically()))
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Останавливаем фоновые задачи и пул процессов экспорта"""
+    for task in _background_tasks:
+        task.cancel()
+    shutdown_executor()
+
 # OAuth2 схема для защиты маршрутов
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token", auto_error=False)
 
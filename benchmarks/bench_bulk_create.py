@@ -0,0 +1,83 @@
+"""
+Добавление занятий одним POST /api/schedule/bulk и по одному через
+POST /api/schedule (с проверкой накладок, как в настройках по умолчанию).
+
+    python benchmarks/bench_bulk_create.py [--days 50] [--groups 25] [--single 500]
+
+Пакет — days x groups x 4 пары без накладок; поштучно добавляются первые
+--single занятий такого же пакета в отдельный шаблон.
+"""
+from datetime import timedelta
+import argparse
+import logging
+import time
+
+from common import setup, seed
+
+LESSONS_PER_DAY = 4
+
+def schedule_items(db, template) -> list:
+    """Занятия без накладок: у каждой группы свои преподаватель, предмет и кабинет"""
+    from app.api.models import Groups, Lessons, Rooms, Teachers
+    prefix = template.name
+    groups = db.query(Groups).filter(Groups.name.like(f"{prefix}-%")).order_by(Groups.id).all()
+    lessons = db.query(Lessons).join(Teachers, Lessons.teacher_id == Teachers.id).filter(
+        Teachers.name.like(f"{prefix} преподаватель %")
+    ).order_by(Lessons.id).all()
+    rooms = db.query(Rooms).filter(Rooms.number.like(f"{prefix} %")).order_by(Rooms.id).all()
+    items = []
+    for offset in range((template.date_end - template.date_start).days + 1):
+        day = template.date_start + timedelta(days=offset)
+        for index, group in enumerate(groups):
+            for lesson_number in range(1, LESSONS_PER_DAY + 1):
+                items.append({
+                    "template_id": template.id, "date": day.isoformat(), "group_id": group.id,
+                    "lesson_id": lessons[index].id, "teacher_id": lessons[index].teacher_id,
+                    "room_id": rooms[index].id, "lesson_number": lesson_number,
+                    "is_above_line": lesson_number % 2 == 1, "lesson_type": "lecture"
+                })
+    return items
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=50)
+    parser.add_argument("--groups", type=int, default=25)
+    parser.add_argument("--single", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from fastapi.testclient import TestClient
+    from app.api.database import SessionLocal
+    from app.main import app
+
+    # Каждый запрос TestClient иначе пишет строку в лог
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+    db = SessionLocal()
+
+    def prepare(name: str) -> list:
+        template = seed(
+            db, days=args.days, groups=args.groups, lessons_per_day=0,
+            teachers=args.groups, rooms=args.groups, name=name
+        )
+        return schedule_items(db, template)
+
+    items = prepare("Пакет")
+    started = time.perf_counter()
+    response = client.post("/api/schedule/bulk", json={"items": items})
+    bulk = time.perf_counter() - started
+    response.raise_for_status()
+    assert response.json()["created"] == len(items)
+
+    single_items = prepare("Поштучно")[:args.single]
+    started = time.perf_counter()
+    for item in single_items:
+        client.post("/api/schedule", json=item).raise_for_status()
+    single = time.perf_counter() - started
+
+    print(f"POST /api/schedule/bulk, {len(items)} занятий: {bulk:.3f} с ({bulk / len(items) * 1000:.3f} мс на занятие)")
+    print(f"POST /api/schedule, {len(single_items)} занятий: {single:.3f} с ({single / len(single_items) * 1000:.3f} мс на занятие)")
+    db.close()
+
+if __name__ == "__main__":
+    main()
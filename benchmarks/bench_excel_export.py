@@ -0,0 +1,68 @@
+"""
+Выгрузка шаблона в Excel (write_schedule_workbook): с индексом
+занятий build_slot_index и с прежним поиском занятия перебором всего списка
+для каждой ячейки.
+
+    python benchmarks/bench_excel_export.py [--groups 8] [--days 30 120]
+"""
+import argparse
+import os
+
+from common import setup, best_of, seed
+
+class ScanSlots:
+    """
+    Прежний поиск занятия ячейки: проход по всем занятиям шаблона.
+    Повторяет фильтр из прежнего обработчика export_excel.
+    """
+    def __init__(self, lessons, is_full_semester: bool):
+        self.lessons = lessons
+        self.is_full_semester = is_full_semester
+
+    def get(self, key):
+        group_id, lesson_number, day_key, above = key
+        if self.is_full_semester:
+            found = [
+                lesson for lesson in self.lessons
+                if lesson.group_id == group_id and lesson.lesson_number == lesson_number
+                and lesson.day_of_week == day_key and bool(lesson.is_above_line) == above
+            ]
+        else:
+            found = [
+                lesson for lesson in self.lessons
+                if lesson.group_id == group_id and lesson.lesson_number == lesson_number
+                and str(lesson.date) == str(day_key) and bool(lesson.is_above_line) == above
+            ]
+        return found[0] if found else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 120])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from app.api.database import SessionLocal
+    from app.api import export
+    from app.api.snapshots import load_template_snapshot
+
+    def render(snapshot, slots):
+        with open(os.devnull, "wb") as fileobj:
+            export.write_schedule_workbook(snapshot.template, snapshot.groups, slots, fileobj)
+
+    db = SessionLocal()
+    print(f"{'дней':>6}{'занятий':>10}{'индекс, с':>12}{'перебор, с':>13}")
+    for days in args.days:
+        template = seed(db, days=days, groups=args.groups, name=f"Excel {days}")
+        snapshot = load_template_snapshot(db, template)
+        is_full_semester = snapshot.template.is_full_semester
+        indexed = best_of(
+            lambda: render(snapshot, export.build_slot_index(snapshot.lessons, is_full_semester)), args.repeat
+        )
+        scanned = best_of(lambda: render(snapshot, ScanSlots(snapshot.lessons, is_full_semester)), args.repeat)
+        print(f"{days:>6}{len(snapshot.lessons):>10}{indexed:>12.3f}{scanned:>13.3f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Выгрузка шаблона в PDF (render_export_file("pdf", ...)) для нескольких
+длин шаблона. С --baseline тот же снимок рендерится модулем export.py
+из указанной ревизии git, например из коммита до разбиения PDF по дням.
+
+    python benchmarks/bench_pdf_export.py [--groups 8] [--days 30 120] [--baseline <ревизия>]
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import tempfile
+
+from common import ROOT, setup, best_of, seed
+
+def load_export_module(revision: str):
+    """Модуль app/api/export.py из ревизии git (импортирует только сторонние пакеты)"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:app/api/export.py"], cwd=ROOT, check=True, capture_output=True
+    ).stdout
+    fd, path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, "wb") as fileobj:
+        fileobj.write(source)
+    spec = importlib.util.spec_from_file_location("export_baseline", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.unlink(path)
+    return module
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 120])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="ревизия git для сравнения")
+    args = parser.parse_args()
+
+    setup()
+    from app.api.database import SessionLocal
+    from app.api import export
+    from app.api.snapshots import load_template_snapshot
+
+    modules = {"текущий": export}
+    if args.baseline:
+        modules[args.baseline] = load_export_module(args.baseline)
+
+    def render(module, snapshot):
+        os.unlink(module.render_export_file("pdf", module.ExportSnapshot(*snapshot)))
+
+    db = SessionLocal()
+    print(f"{'дней':>6}{'занятий':>10}" + "".join(f"{name + ', с':>16}" for name in modules))
+    for days in args.days:
+        template = seed(db, days=days, groups=args.groups, name=f"PDF {days}")
+        snapshot = load_template_snapshot(db, template)
+        timings = [best_of(lambda: render(module, snapshot), args.repeat) for module in modules.values()]
+        print(f"{days:>6}{len(snapshot.lessons):>10}" + "".join(f"{timing:>16.3f}" for timing in timings))
+    db.close()
+
+if __name__ == "__main__":
+    main()
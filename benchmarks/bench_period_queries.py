@@ -0,0 +1,53 @@
+"""
+Выборка занятий группы и преподавателя за неделю и месяц (/api/v1/schedule)
+на таблице schedules из миллиона строк: с составными индексами
+(сущность, дата, пара) и после их удаления.
+
+    python benchmarks/bench_period_queries.py [--days 500] [--groups 500]
+"""
+from datetime import timedelta
+import argparse
+
+from common import setup, best_of, seed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from sqlalchemy import text
+    from app.api.database import SessionLocal
+    from app.api.models import Schedule
+    from app.api.schedule_rows import group_lessons, teacher_lessons
+
+    db = SessionLocal()
+    template = seed(db, days=args.days, groups=args.groups, teachers=200, rooms=150)
+    total = db.query(Schedule).count()
+    group_id = db.query(Schedule.group_id).filter(Schedule.template_id == template.id).first()[0]
+    teacher_id = db.query(Schedule.teacher_id).filter(Schedule.template_id == template.id).first()[0]
+    week_start = template.date_start + timedelta(days=args.days // 2)
+    periods = {"неделя": (week_start, week_start + timedelta(days=6)), "месяц": (week_start, week_start + timedelta(days=30))}
+
+    def measure() -> dict:
+        results = {}
+        for period, (start, end) in periods.items():
+            results[("группа", period)] = best_of(lambda: group_lessons(db, group_id, start, end, ordered=True))
+            results[("преподаватель", period)] = best_of(lambda: teacher_lessons(db, teacher_id, start, end, ordered=True))
+        return results
+
+    indexed = measure()
+    for index in ("ix_schedules_group_date", "ix_schedules_teacher_date", "ix_schedules_room_date"):
+        db.execute(text(f"DROP INDEX {index}"))
+    db.commit()
+    plain = measure()
+
+    print(f"Строк в schedules: {total}")
+    print(f"{'запрос':<26}{'с индексом, мс':>16}{'без индекса, мс':>18}")
+    for key in indexed:
+        print(f"{key[0] + ', ' + key[1]:<26}{indexed[key] * 1000:>16.2f}{plain[key] * 1000:>18.2f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Ответ GET /api/schedules?template_id=... целиком (страница PAGE_MAX_LIMIT):
+обычный путь через модели pydantic и быстрый путь fast=true.
+
+    python benchmarks/bench_schedules_json.py [--sizes 30x12 50x50]
+
+Размер задается как <дней>x<групп>, у каждой группы по 4 пары в день.
+"""
+import argparse
+import logging
+
+from common import setup, best_of, seed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["30x12", "50x50"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from fastapi.testclient import TestClient
+    from config import settings
+    from app.api.database import SessionLocal
+    from app.main import app
+
+    # Каждый запрос TestClient иначе пишет строку в лог
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+    db = SessionLocal()
+
+    def fetch(params: dict) -> int:
+        response = client.get("/api/schedules", params=params)
+        response.raise_for_status()
+        return len(response.json())
+
+    print(f"{'строк':>8}{'обычный, с':>14}{'fast=true, с':>15}")
+    for size in args.sizes:
+        days, groups = (int(part) for part in size.split("x"))
+        template = seed(db, days=days, groups=groups, name=f"JSON {size}")
+        params = {"template_id": template.id, "limit": settings.PAGE_MAX_LIMIT}
+        rows = fetch(params)
+        assert rows == fetch(dict(params, fast="true"))
+        default = best_of(lambda: fetch(params), args.repeat)
+        fast = best_of(lambda: fetch(dict(params, fast="true")), args.repeat)
+        print(f"{rows:>8}{default:>14.3f}{fast:>15.3f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
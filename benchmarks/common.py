@@ -0,0 +1,92 @@
+"""
+Общая часть бенчмарков: отдельная база SQLite во временном каталоге,
+импорт пакета app и быстрое заполнение расписания.
+Скрипты запускаются из корня проекта: python benchmarks/bench_<название>.py
+"""
+from datetime import date, timedelta
+import os
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup():
+    """Готовит окружение до импорта config и app (как tests/conftest.py) и создает таблицы"""
+    sys.path.insert(0, ROOT)
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["EXPORT_CACHE_DIR"] = ""
+    os.chdir(ROOT)
+    # app.py в корне перекрывает пакет app (каталог без __init__.py)
+    if "app" not in sys.modules:
+        app_package = types.ModuleType("app")
+        app_package.__path__ = [os.path.join(ROOT, "app")]
+        sys.modules["app"] = app_package
+    from app.api.database import Base, engine
+    from app.api import models  # noqa: F401 — регистрирует таблицы в Base.metadata
+    Base.metadata.create_all(bind=engine)
+
+def best_of(func, repeat: int = 5) -> float:
+    """Лучшее время func() из repeat запусков, в секундах"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def seed(
+    db,
+    days: int,
+    groups: int,
+    lessons_per_day: int = 4,
+    teachers: int = 20,
+    rooms: int = 20,
+    name: str = "Шаблон",
+    date_start: date = date(2025, 9, 1),
+    group_type: str = "СПО",
+    is_full_semester: bool = False
+):
+    """
+    Шаблон на days дней: у каждой группы lessons_per_day пар в день.
+    Преподаватели и кабинеты раздаются по кругу; занятия вставляются пачками.
+    """
+    from sqlalchemy import insert
+    from app.api.models import Groups, Lessons, Teachers, Rooms, Schedule, ScheduleTemplate
+
+    teacher_rows = [Teachers(name=f"{name} преподаватель {index}", description="") for index in range(teachers)]
+    room_rows = [Rooms(number=f"{name} {index}", capacity=30, description="") for index in range(rooms)]
+    db.add_all(teacher_rows + room_rows)
+    db.flush()
+    lesson_rows = [Lessons(name=f"Предмет {index}", teacher_id=teacher.id) for index, teacher in enumerate(teacher_rows)]
+    group_rows = [Groups(name=f"{name}-{index}", type=group_type, description="") for index in range(groups)]
+    template = ScheduleTemplate(
+        name=name, group_type=group_type, date_start=date_start,
+        date_end=date_start + timedelta(days=days - 1), schedule_type="regular",
+        is_full_semester=is_full_semester
+    )
+    db.add_all(lesson_rows + group_rows + [template])
+    db.flush()
+
+    batch = []
+    for offset in range(days):
+        day = date_start + timedelta(days=offset)
+        for group_index, group in enumerate(group_rows):
+            for lesson_number in range(1, lessons_per_day + 1):
+                slot = group_index * lessons_per_day + lesson_number
+                batch.append({
+                    "template_id": template.id, "date": day, "group_id": group.id,
+                    "lesson_id": lesson_rows[slot % teachers].id, "teacher_id": teacher_rows[slot % teachers].id,
+                    "room_id": room_rows[slot % rooms].id, "lesson_number": lesson_number,
+                    "is_above_line": lesson_number % 2 == 1, "lesson_type": "lecture",
+                    "day_of_week": day.isoweekday() if is_full_semester else None
+                })
+                if len(batch) >= 50000:
+                    db.execute(insert(Schedule), batch)
+                    batch = []
+    if batch:
+        db.execute(insert(Schedule), batch)
+    db.commit()
+    return template
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Сжатие журнала изменений (/api/changes) для запуска из cron.
+Нужен, если фоновое сжатие в воркерах отключено (CHANGE_LOG_COMPACT_INTERVAL=0).
+"""
+import sys
+import types
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+def compact():
+    # app.py в корне перекрывает пакет app (каталог без __init__.py)
+    app_package = types.ModuleType("app")
+    app_package.__path__ = [os.path.join(ROOT, "app")]
+    sys.modules["app"] = app_package
+
+    from app.api.changes import compact_changes_once
+
+    result = compact_changes_once()
+    print(f"Удалено вытесненных записей: {result['superseded']}, устаревших: {result['expired']}")
+
+if __name__ == "__main__":
+    compact()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env файла
@@ -18,6 +19,52 @@ class Settings:
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Export (пул процессов для рендеринга Excel/PDF в каждом воркере)
+    EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", "2"))
+    EXPORT_MAX_CONCURRENCY: int = int(os.getenv("EXPORT_MAX_CONCURRENCY", "4"))
+    EXPORT_RETRY_AFTER: int = int(os.getenv("EXPORT_RETRY_AFTER", "10"))
+    # Кэш готовых выгрузок: в памяти воркера и (если задан каталог) на диске
+    EXPORT_CACHE_MAX_BYTES: int = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    EXPORT_CACHE_DIR: str = os.getenv("EXPORT_CACHE_DIR", "")
+    EXPORT_CACHE_DISK_MAX_BYTES: int = int(os.getenv("EXPORT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Пакетные выгрузки: каталог для ZIP-архивов должен быть общим для всех воркеров
+    EXPORT_JOBS_DIR: str = os.getenv("EXPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "schedule_export_jobs"))
+    EXPORT_JOB_TIMEOUT: int = int(os.getenv("EXPORT_JOB_TIMEOUT", "1800"))
+    EXPORT_JOB_TTL: int = int(os.getenv("EXPORT_JOB_TTL", str(24 * 60 * 60)))
+    
+    # Кэш ответов /api/v1/schedule в памяти воркера
+    SCHEDULE_CACHE_MAX_ENTRIES: int = int(os.getenv("SCHEDULE_CACHE_MAX_ENTRIES", "2048"))
+    SCHEDULE_CACHE_TTL: int = int(os.getenv("SCHEDULE_CACHE_TTL", "60"))
+    # Пакетный запрос /api/v1/schedule/batch: максимум групп и преподавателей
+    SCHEDULE_BATCH_MAX_ENTITIES: int = int(os.getenv("SCHEDULE_BATCH_MAX_ENTITIES", "200"))
+    
+    # Keyset-пагинация списков: размер страницы по умолчанию и максимальный
+    PAGE_DEFAULT_LIMIT: int = int(os.getenv("PAGE_DEFAULT_LIMIT", "1000"))
+    PAGE_MAX_LIMIT: int = int(os.getenv("PAGE_MAX_LIMIT", "10000"))
+    
+    # Пакетное добавление занятий: максимум элементов в одном запросе
+    SCHEDULE_BULK_MAX_ITEMS: int = int(os.getenv("SCHEDULE_BULK_MAX_ITEMS", "10000"))
+    
+    # Нагрузка преподавателей: часов в одной паре (академических)
+    WORKLOAD_HOURS_PER_LESSON: int = int(os.getenv("WORKLOAD_HOURS_PER_LESSON", "2"))
+    # Итоги еженедельных занятий шаблонов по периодам в памяти воркера
+    WORKLOAD_CACHE_MAX_ENTRIES: int = int(os.getenv("WORKLOAD_CACHE_MAX_ENTRIES", "256"))
+    
+    # Проверка накладок преподавателей и кабинетов при записи занятий
+    SCHEDULE_CONFLICT_CHECK: bool = os.getenv("SCHEDULE_CONFLICT_CHECK", "True").lower() == "true"
+    
+    # Журнал изменений (/api/changes): срок хранения записей и период фонового сжатия
+    # в секундах (0 — сжатие только скриптом compact_changes.py)
+    CHANGE_LOG_RETENTION_DAYS: int = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+    CHANGE_LOG_COMPACT_INTERVAL: int = int(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", "3600"))
+    
+    # Календарные подписки (.ics): время пар и глубина истории в днях
+    LESSON_TIMES: str = os.getenv(
+        "LESSON_TIMES",
+        "08:30-10:00,10:10-11:40,12:20-13:50,14:00-15:30,15:40-17:10,17:20-18:50,19:00-20:30"
+    )
+    CALENDAR_PAST_DAYS: int = int(os.getenv("CALENDAR_PAST_DAYS", "30"))
+    
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
 
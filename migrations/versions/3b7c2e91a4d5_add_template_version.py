@@ -0,0 +1,31 @@
+"""add template version
+
+Revision ID: 3b7c2e91a4d5
+Revises: 5d9ff1006502
+Create Date: 2026-10-18 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c2e91a4d5'
+down_revision: Union[str, None] = '5d9ff1006502'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('schedule_templates', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('schedule_templates', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('schedule_templates') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
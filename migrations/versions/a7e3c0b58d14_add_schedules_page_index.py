@@ -0,0 +1,28 @@
+"""add schedules page index
+
+Revision ID: a7e3c0b58d14
+Revises: f2d84b6a1c97
+Create Date: 2026-10-18 14:51:37.128904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c0b58d14'
+down_revision: Union[str, None] = 'f2d84b6a1c97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_schedules_template_page', 'schedules', ['template_id', 'date', 'lesson_number', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_schedules_template_page', table_name='schedules')
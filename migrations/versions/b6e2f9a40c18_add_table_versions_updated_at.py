@@ -0,0 +1,29 @@
+"""add table_versions.updated_at
+
+Revision ID: b6e2f9a40c18
+Revises: d4b9e2a71f35
+Create Date: 2026-10-18 19:24:13.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f9a40c18'
+down_revision: Union[str, None] = 'd4b9e2a71f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('table_versions', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('table_versions') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,36 @@
+"""add table_versions
+
+Revision ID: c5a1f7d93e20
+Revises: 8e41d0c6f2b7
+Create Date: 2026-10-18 13:26:05.311742
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a1f7d93e20'
+down_revision: Union[str, None] = '8e41d0c6f2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table_versions = op.create_table('table_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(table_versions, [
+        {'name': name, 'version': 1}
+        for name in ('groups', 'teachers', 'lessons', 'rooms', 'schedule_templates')
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_versions')
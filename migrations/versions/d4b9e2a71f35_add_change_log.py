@@ -0,0 +1,43 @@
+"""add change_log
+
+Revision ID: d4b9e2a71f35
+Revises: a7e3c0b58d14
+Create Date: 2026-10-18 16:02:41.507318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b9e2a71f35'
+down_revision: Union[str, None] = 'a7e3c0b58d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('change_log',
+    sa.Column('seq', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_change_log_entity', 'change_log', ['table_name', 'entity_id', 'seq'], unique=False)
+    table_versions = sa.table('table_versions', sa.column('name', sa.String()), sa.column('version', sa.Integer()))
+    op.bulk_insert(table_versions, [
+        {'name': 'change_log', 'version': 0},
+        {'name': 'change_log_horizon', 'version': 0}
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM table_versions WHERE name IN ('change_log', 'change_log_horizon')")
+    op.drop_index('ix_change_log_entity', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,36 @@
+"""add schedules indexes
+
+Revision ID: f2d84b6a1c97
+Revises: c5a1f7d93e20
+Create Date: 2026-10-18 14:08:52.640317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d84b6a1c97'
+down_revision: Union[str, None] = 'c5a1f7d93e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_schedules_group_date', 'schedules', ['group_id', 'date', 'lesson_number'], unique=False)
+    op.create_index('ix_schedules_teacher_date', 'schedules', ['teacher_id', 'date', 'lesson_number'], unique=False)
+    op.create_index('ix_schedules_room_date', 'schedules', ['room_id', 'date', 'lesson_number'], unique=False)
+    op.create_index('ix_schedules_template_day', 'schedules', ['template_id', 'day_of_week', 'lesson_number'], unique=False)
+    op.create_index('ix_schedules_lesson_id', 'schedules', ['lesson_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_schedules_lesson_id', table_name='schedules')
+    op.drop_index('ix_schedules_template_day', table_name='schedules')
+    op.drop_index('ix_schedules_room_date', table_name='schedules')
+    op.drop_index('ix_schedules_teacher_date', table_name='schedules')
+    op.drop_index('ix_schedules_group_date', table_name='schedules')
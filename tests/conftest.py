@@ -0,0 +1,94 @@
+"""
+Общие фикстуры тестов: отдельная SQLite-база во временном каталоге,
+заполнение шаблона расписания и подсчет SQL-запросов.
+"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# База и каталоги задаются до импорта config
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["EXPORT_CACHE_DIR"] = ""
+os.chdir(ROOT)
+# app.py в корне перекрывает пакет app (каталог без __init__.py)
+if "app" not in sys.modules:
+    app_package = types.ModuleType("app")
+    app_package.__path__ = [os.path.join(ROOT, "app")]
+    sys.modules["app"] = app_package
+
+import pytest
+from sqlalchemy import event
+
+from app.api.database import Base, engine, SessionLocal
+from app.api.models import Groups, Teachers, Lessons, Rooms, Schedule, ScheduleTemplate
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app, raise_server_exceptions=False)
+
+def seed_template(
+    db,
+    days: int,
+    groups: int,
+    name: str = "Шаблон",
+    date_start: date = date(2025, 9, 1),
+    is_full_semester: bool = False,
+    group_type: str = "СПО"
+) -> ScheduleTemplate:
+    """Шаблон с двумя парами в день у каждой группы (один преподаватель и кабинет)"""
+    teacher = Teachers(name=f"Преподаватель {name}", description="")
+    room = Rooms(number=f"Кабинет {name}", capacity=30, description="")
+    db.add_all([teacher, room])
+    db.flush()
+    lesson = Lessons(name="Математика", teacher_id=teacher.id)
+    group_rows = [Groups(name=f"{name}-{index}", type=group_type, description="") for index in range(groups)]
+    template = ScheduleTemplate(
+        name=name, group_type=group_type, date_start=date_start,
+        date_end=date_start + timedelta(days=days - 1), schedule_type="regular",
+        is_full_semester=is_full_semester
+    )
+    db.add_all([lesson, template, *group_rows])
+    db.flush()
+    for offset in range(days):
+        day = date_start + timedelta(days=offset)
+        for group in group_rows:
+            for lesson_number in (1, 2):
+                db.add(Schedule(
+                    template_id=template.id, date=day, group_id=group.id, lesson_id=lesson.id,
+                    teacher_id=teacher.id, room_id=room.id, lesson_number=lesson_number,
+                    is_above_line=True, lesson_type="lecture",
+                    day_of_week=day.isoweekday() if is_full_semester else None
+                ))
+    db.commit()
+    return template
+
+@contextmanager
+def count_statements():
+    """Считает SQL-запросы, выполненные внутри блока: with count_statements() as statements"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,19 @@
+from app.api.changes import compact_changes_once
+from app.api.models import ChangeLog, Schedule
+
+from conftest import seed_template
+
+def test_reading_changes_does_not_compact_the_log(db, client):
+    template = seed_template(db, days=1, groups=1)
+    lesson = db.query(Schedule).filter(Schedule.template_id == template.id).first()
+    lesson.lesson_type = "practice"
+    db.commit()
+    logged = db.query(ChangeLog).count()
+
+    response = client.get("/api/changes", params={"since": 0})
+
+    assert response.status_code == 200
+    assert db.query(ChangeLog).count() == logged
+    # Первая запись занятия вытеснена его изменением
+    assert compact_changes_once() == {"superseded": 1, "expired": 0}
+    assert db.query(ChangeLog).count() == logged - 1
@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+from app.api.conflicts import check_conflicts, template_conflicts
+from app.api.models import Rooms, Schedule, Teachers
+from app.api.schemas import ScheduleCreate
+
+from conftest import seed_template
+
+SECOND_MONDAY = date(2025, 9, 8)
+
+def _semester_and_week(db):
+    """Еженедельный шаблон на четыре недели и обычный шаблон второй недели с другим преподавателем"""
+    semester = seed_template(db, days=7, groups=1, name="Семестр", is_full_semester=True)
+    semester.date_end = semester.date_start + timedelta(days=27)
+    week = seed_template(db, days=7, groups=1, name="Неделя", date_start=SECOND_MONDAY)
+    weekly = db.query(Schedule).filter(
+        Schedule.template_id == semester.id, Schedule.day_of_week == 1, Schedule.lesson_number == 1
+    ).one()
+    lesson = db.query(Schedule).filter(Schedule.template_id == week.id).first()
+    # Новые занятия ставятся в свободный кабинет
+    room = Rooms(number="Свободный кабинет", capacity=30, description="")
+    db.add(room)
+    db.commit()
+    return semester, weekly, lesson, room.id
+
+def _candidate(other, room_id: int, teacher_id: int, day: date) -> ScheduleCreate:
+    return ScheduleCreate(
+        template_id=other.template_id, date=day, group_id=other.group_id, lesson_id=other.lesson_id,
+        teacher_id=teacher_id, room_id=room_id, lesson_number=1,
+        is_above_line=True, lesson_type="lecture"
+    )
+
+def _dated_row(template_id: int, day: date, group_id: int, lesson_id: int, teacher_id: int, room_id: int) -> Schedule:
+    return Schedule(
+        template_id=template_id, date=day, group_id=group_id, lesson_id=lesson_id, teacher_id=teacher_id,
+        room_id=room_id, lesson_number=1, is_above_line=True, lesson_type="practice"
+    )
+
+def test_weekly_lesson_clashes_with_dated_lesson(db):
+    _, weekly, other, room_id = _semester_and_week(db)
+
+    conflicts = check_conflicts(db, [_candidate(other, room_id, weekly.teacher_id, SECOND_MONDAY)])
+
+    assert [(conflict["resource"], conflict["date"]) for conflict in conflicts] == [("teacher", "2025-09-08")]
+
+def test_overridden_weekly_lesson_is_not_a_conflict(db):
+    semester, weekly, other, room_id = _semester_and_week(db)
+    substitute = Teachers(name="Замена", description="")
+    room = Rooms(number="Кабинет замены", capacity=30, description="")
+    db.add_all([substitute, room])
+    db.flush()
+    # Строка шаблона на весь семестр без day_of_week заменяет пару группы во второй понедельник
+    db.add(_dated_row(semester.id, SECOND_MONDAY, weekly.group_id, weekly.lesson_id, substitute.id, room.id))
+    db.commit()
+
+    assert check_conflicts(db, [_candidate(other, room_id, weekly.teacher_id, SECOND_MONDAY)]) == []
+    assert len(check_conflicts(db, [_candidate(other, room_id, weekly.teacher_id, SECOND_MONDAY + timedelta(days=7))])) == 1
+    assert len(check_conflicts(db, [_candidate(other, room_id, substitute.id, SECOND_MONDAY)])) == 1
+
+def test_dated_rows_of_full_semester_template_are_compared(db):
+    semester, weekly, other, room_id = _semester_and_week(db)
+    day = SECOND_MONDAY + timedelta(days=2)
+    db.add(_dated_row(semester.id, day, weekly.group_id, weekly.lesson_id, other.teacher_id, weekly.room_id))
+    db.commit()
+
+    conflicts = template_conflicts(db, semester)
+
+    assert [(conflict["resource"], conflict["date"]) for conflict in conflicts] == [("teacher", day.isoformat())]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from app.api import jobs
+from app.api.cache import export_cache
+from app.api.models import ExportJob
+
+from conftest import seed_template
+
+@pytest.fixture
+def job_dirs(tmp_path, monkeypatch):
+    """Архивы и временные файлы задачи в отдельных каталогах теста"""
+    from config import settings
+
+    work_dir = tmp_path / "tmp"
+    work_dir.mkdir()
+    monkeypatch.setattr(settings, "EXPORT_JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(tempfile, "tempdir", str(work_dir))
+    export_cache.clear()
+    return work_dir
+
+def _create_job(db, templates, formats) -> str:
+    db.add(ExportJob(id="job", status="pending", params=json.dumps({
+        "template_ids": [template.id for template in templates], "formats": formats
+    })))
+    db.commit()
+    return "job"
+
+def _run_in_process(monkeypatch, fail_format=None):
+    async def run_export(func, export_format, snapshot):
+        if export_format == fail_format:
+            raise RuntimeError("ошибка рендеринга")
+        return func(export_format, snapshot)
+
+    monkeypatch.setattr(jobs, "run_export", run_export)
+
+def _open_exports() -> int:
+    """Открытые процессом файлы выгрузок"""
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(os.path.join("/proc/self/fd", fd))
+        except OSError:
+            continue
+        count += ".xlsx" in target or ".pdf" in target
+    return count
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="нужен /proc")
+def test_job_archives_cached_and_rendered_exports(db, job_dirs, monkeypatch):
+    templates = [seed_template(db, days=2, groups=1, name=f"Шаблон {index}") for index in range(2)]
+    _run_in_process(monkeypatch)
+    asyncio.run(jobs.run_export_job(_create_job(db, templates[:1], ["xlsx"])))
+    db.query(ExportJob).delete()
+    db.commit()
+    write_zip = jobs._write_zip
+    opened = []
+
+    def counting_write_zip(*args):
+        # До записи архива выгрузки не должны держать открытые файлы
+        opened.append(_open_exports())
+        return write_zip(*args)
+
+    monkeypatch.setattr(jobs, "_write_zip", counting_write_zip)
+    asyncio.run(jobs.run_export_job(_create_job(db, templates, ["xlsx", "pdf"])))
+
+    job = db.query(ExportJob).one()
+    db.refresh(job)
+    assert job.status == "done", job.error
+    with zipfile.ZipFile(job.file_path) as archive:
+        assert len(archive.namelist()) == 4
+    assert opened == [0]
+    assert os.listdir(job_dirs) == []
+
+def test_failed_job_removes_rendered_files(db, job_dirs, monkeypatch):
+    templates = [seed_template(db, days=2, groups=1, name=f"Шаблон {index}") for index in range(3)]
+    _run_in_process(monkeypatch, fail_format="pdf")
+
+    asyncio.run(jobs.run_export_job(_create_job(db, templates, ["xlsx", "pdf"])))
+
+    job = db.query(ExportJob).one()
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.error == "ошибка рендеринга"
+    assert os.listdir(job_dirs) == []
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from app.api.models import Rooms, Schedule
+
+from conftest import seed_template
+
+def _free_rooms(client, day: date) -> list:
+    response = client.get("/api/rooms/free", params={"date": day.isoformat(), "lesson_from": 1})
+    return sorted(room["number"] for room in response.json())
+
+def test_free_rooms_follow_overrides_of_weekly_lessons(db, client):
+    semester = seed_template(db, days=7, groups=1, name="Семестр", is_full_semester=True)
+    semester.date_end = semester.date_start + timedelta(days=27)
+    weekly = db.query(Schedule).filter(
+        Schedule.template_id == semester.id, Schedule.day_of_week == 1, Schedule.lesson_number == 1
+    ).one()
+    spare = Rooms(number="Запасной", capacity=30, description="")
+    db.add(spare)
+    db.flush()
+    second_monday = semester.date_start + timedelta(days=7)
+    # Строка без day_of_week переносит первую пару группы во второй понедельник в другой кабинет
+    db.add(Schedule(
+        template_id=semester.id, date=second_monday, group_id=weekly.group_id, lesson_id=weekly.lesson_id,
+        teacher_id=weekly.teacher_id, room_id=spare.id, lesson_number=1, is_above_line=True, lesson_type="lecture"
+    ))
+    db.commit()
+
+    assert _free_rooms(client, semester.date_start) == ["Запасной"]
+    assert _free_rooms(client, second_monday) == ["Кабинет Семестр"]
+    third_monday = second_monday + timedelta(days=7)
+    assert _free_rooms(client, third_monday) == ["Запасной"]
+
+    # Замена через API применяется к уже построенному индексу на месте
+    response = client.post("/api/schedule", json={
+        "template_id": semester.id, "date": third_monday.isoformat(), "group_id": weekly.group_id,
+        "lesson_id": weekly.lesson_id, "teacher_id": weekly.teacher_id, "room_id": spare.id,
+        "lesson_number": 1, "is_above_line": True, "lesson_type": "lecture"
+    })
+    assert response.status_code == 200
+    assert _free_rooms(client, third_monday) == ["Кабинет Семестр"]
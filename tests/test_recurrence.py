@@ -0,0 +1,63 @@
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+from app.api.models import Schedule
+
+from conftest import seed_template
+
+def _semester_with_override(db):
+    """Неделя еженедельных занятий на четыре недели и замена первой пары группы во второй понедельник"""
+    monday = date.today() - timedelta(days=date.today().weekday())
+    template = seed_template(db, days=7, groups=1, date_start=monday, is_full_semester=True)
+    template.date_end = monday + timedelta(days=27)
+    weekly = db.query(Schedule).filter(
+        Schedule.template_id == template.id, Schedule.day_of_week == 1, Schedule.lesson_number == 1
+    ).one()
+    override_day = monday + timedelta(days=7)
+    db.add(Schedule(
+        template_id=template.id, date=override_day, group_id=weekly.group_id, lesson_id=weekly.lesson_id,
+        teacher_id=weekly.teacher_id, room_id=weekly.room_id, lesson_number=1,
+        is_above_line=True, lesson_type="practice"
+    ))
+    db.commit()
+    return weekly, override_day
+
+def test_calendar_excludes_overridden_weekly_dates(db, client):
+    weekly, override_day = _semester_with_override(db)
+
+    response = client.get(f"/api/v1/calendar/group/{weekly.group_id}.ics")
+
+    assert response.status_code == 200
+    body = response.text
+    assert body.count("RRULE:") == 14
+    assert body.count("EXDATE:") == 1
+    assert f"EXDATE:{override_day.strftime('%Y%m%d')}T" in body
+
+def test_group_schedule_replaces_overridden_weekly_lesson(db, client):
+    weekly, override_day = _semester_with_override(db)
+
+    response = client.get(f"/api/v1/schedule/group/{weekly.group_id}", params={
+        "date_start": override_day.isoformat(), "date_end": override_day.isoformat()
+    })
+
+    lessons = response.json()["schedule"]
+    assert len(lessons) == 2
+    assert sorted(lesson["lesson_type"] for lesson in lessons) == ["lecture", "practice"]
+
+def test_calendar_last_modified_moves_forward_when_template_is_deleted(db, client):
+    monday = date.today() - timedelta(days=date.today().weekday())
+    kept = seed_template(db, days=7, groups=1, name="Остается", date_start=monday)
+    deleted = seed_template(db, days=7, groups=1, name="Удаляется", date_start=monday + timedelta(days=7))
+    kept.updated_at = datetime(2025, 1, 1)
+    deleted.updated_at = datetime(2025, 6, 1)
+    teacher_id = db.query(Schedule.teacher_id).filter(Schedule.template_id == deleted.id).first()[0]
+    db.query(Schedule).filter(Schedule.template_id == kept.id).update({Schedule.teacher_id: teacher_id})
+    db.commit()
+    url = f"/api/v1/calendar/teacher/{teacher_id}.ics"
+
+    before = client.get(url)
+    client.delete(f"/api/schedule-templates/{deleted.id}")
+    after = client.get(url)
+
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert parsedate_to_datetime(after.headers["Last-Modified"]) > parsedate_to_datetime(before.headers["Last-Modified"])
@@ -0,0 +1,28 @@
+from app.api.models import Schedule
+from app.api.schedule_cache import schedule_cache
+from app.api.versions import bump_template_version
+
+from conftest import seed_template
+
+def test_cached_schedule_is_not_served_after_change_in_another_worker(db, client):
+    schedule_cache.clear()
+    template = seed_template(db, days=2, groups=1)
+    lesson = db.query(Schedule).filter(Schedule.template_id == template.id).first()
+    url = f"/api/v1/schedule/group/{lesson.group_id}"
+    params = {"date_start": "2025-09-01", "date_end": "2025-09-02"}
+
+    first = client.get(url, params=params)
+    assert len(first.json()["schedule"]) == 4
+
+    # Запись другим воркером: версия шаблона меняется, кэш этого воркера не сбрасывается
+    db.add(Schedule(
+        template_id=template.id, date=lesson.date, group_id=lesson.group_id, lesson_id=lesson.lesson_id,
+        teacher_id=lesson.teacher_id, room_id=lesson.room_id, lesson_number=3,
+        is_above_line=True, lesson_type="lecture"
+    ))
+    bump_template_version(db, template.id)
+    db.commit()
+
+    second = client.get(url, params=params)
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert len(second.json()["schedule"]) == 5
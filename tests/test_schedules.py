@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import seed_template, count_statements
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_schedules_query_count_does_not_depend_on_template_size(db, client, fast):
+    small = seed_template(db, days=1, groups=1, name="Малый")
+    large = seed_template(db, days=50, groups=20, name="Большой")
+    db.refresh(small)
+    db.refresh(large)
+
+    counts = []
+    for template, lessons in ((small, 2), (large, 2000)):
+        with count_statements() as statements:
+            response = client.get("/api/schedules", params={"template_id": template.id, "limit": 5000, "fast": fast})
+        assert response.status_code == 200
+        assert len(response.json()) == lessons
+        counts.append(len(statements))
+
+    # ETag (шаблоны и table_versions) и одна страница занятий со всеми join'ами
+    assert counts == [3, 3]
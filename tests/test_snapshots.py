@@ -0,0 +1,30 @@
+from app.api.snapshots import load_template_snapshot, load_template_snapshots
+
+from conftest import seed_template, count_statements
+
+def test_snapshot_query_count_does_not_depend_on_template_size(db):
+    small = seed_template(db, days=2, groups=1, name="Малый")
+    large = seed_template(db, days=60, groups=20, name="Большой")
+    # Шаблоны загружены заранее, как в обработчиках выгрузки
+    db.refresh(small)
+    db.refresh(large)
+
+    with count_statements() as small_statements:
+        small_snapshot = load_template_snapshot(db, small)
+    with count_statements() as large_statements:
+        large_snapshot = load_template_snapshot(db, large)
+
+    assert len(small_snapshot.lessons) == 4
+    assert len(large_snapshot.lessons) == 2400
+    assert len(small_statements) == len(large_statements) == 2
+
+def test_snapshots_of_many_templates_use_the_same_queries(db):
+    templates = [seed_template(db, days=3, groups=2, name=f"Шаблон {index}") for index in range(5)]
+    for template in templates:
+        db.refresh(template)
+
+    with count_statements() as statements:
+        snapshots = load_template_snapshots(db, templates)
+
+    assert [len(snapshot.lessons) for snapshot in snapshots] == [12] * 5
+    assert len(statements) == 2
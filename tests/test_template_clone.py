@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.models import Schedule, ScheduleTemplate
+from app.api.schemas import ScheduleTemplateClone
+from app.api.template_clone import clone_template
+
+from conftest import seed_template
+
+def test_regular_template_clone_must_keep_weekday(db):
+    template = seed_template(db, days=7, groups=1)
+
+    with pytest.raises(HTTPException) as error:
+        clone_template(db, template, ScheduleTemplateClone(name="Копия", date_start=date(2025, 9, 9)))
+
+    assert error.value.status_code == 400
+
+def test_full_semester_clone_shifts_dated_rows_by_whole_weeks(db):
+    template = seed_template(db, days=7, groups=1, is_full_semester=True)
+    weekly = db.query(Schedule).filter(Schedule.template_id == template.id).first()
+    db.add(Schedule(
+        template_id=template.id, date=date(2025, 9, 3), group_id=weekly.group_id, lesson_id=weekly.lesson_id,
+        teacher_id=weekly.teacher_id, room_id=weekly.room_id, lesson_number=3, is_above_line=True,
+        lesson_type="practice"
+    ))
+    db.commit()
+
+    # Следующий семестр начинается со вторника
+    clone, copied = clone_template(db, template, ScheduleTemplateClone(
+        name="Копия", date_start=date(2026, 9, 1), date_end=date(2026, 12, 31)
+    ))
+
+    assert copied == 15
+    rows = db.query(Schedule).filter(Schedule.template_id == clone.id)
+    dated = [row.date for row in rows if row.day_of_week is None]
+    assert dated == [date(2026, 9, 2)]
+    assert all(clone.date_start <= row.date <= clone.date_end for row in rows)
+
+def test_clone_into_busy_period_is_rejected(db, client):
+    template = seed_template(db, days=7, groups=1, name="Первая неделя")
+    busy = seed_template(db, days=7, groups=1, name="Вторая неделя", date_start=date(2025, 9, 8), group_type="ВО")
+    teacher_id = db.query(Schedule.teacher_id).filter(Schedule.template_id == template.id).first()[0]
+    # Преподаватель первой недели ведет другой предмет во второй неделе
+    db.query(Schedule).filter(Schedule.template_id == busy.id).update({Schedule.teacher_id: teacher_id})
+    db.commit()
+
+    response = client.post(f"/api/schedule-templates/{template.id}/clone", json={
+        "name": "Копия", "date_start": "2025-09-08"
+    })
+
+    assert response.status_code == 409
+    assert response.json()["conflicts"]
+    assert db.query(ScheduleTemplate).filter(ScheduleTemplate.name == "Копия").first() is None
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from app.api.models import Schedule, Teachers
+from app.api.workload import teacher_workload
+
+from conftest import seed_template
+
+def _lessons(workload) -> dict:
+    return {entry["teacher"]["name"]: entry["total"]["lessons"] for entry in workload}
+
+def test_joint_lesson_of_several_groups_is_counted_once(db):
+    seed_template(db, days=2, groups=3, name="Поток")
+
+    assert _lessons(teacher_workload(db, period="template")) == {"Преподаватель Поток": 4}
+
+def test_full_semester_workload_follows_overrides(db):
+    semester = seed_template(db, days=7, groups=1, name="Семестр", is_full_semester=True)
+    semester.date_end = semester.date_start + timedelta(days=13)
+    weekly = db.query(Schedule).filter(
+        Schedule.template_id == semester.id, Schedule.day_of_week == 1, Schedule.lesson_number == 1
+    ).one()
+    substitute = Teachers(name="Замена", description="")
+    db.add(substitute)
+    db.flush()
+    second_monday = semester.date_start + timedelta(days=7)
+    for teacher_id, lesson_number in ((substitute.id, 1), (weekly.teacher_id, 3)):
+        # Строки без day_of_week: замена первой пары и дополнительная третья пара
+        db.add(Schedule(
+            template_id=semester.id, date=second_monday, group_id=weekly.group_id, lesson_id=weekly.lesson_id,
+            teacher_id=teacher_id, room_id=weekly.room_id, lesson_number=lesson_number,
+            is_above_line=True, lesson_type="lecture"
+        ))
+    db.commit()
+
+    workload = teacher_workload(db, period="week")
+
+    assert _lessons(workload) == {"Преподаватель Семестр": 28, "Замена": 1}
+
+def test_weekly_totals_cache_is_bounded(db, monkeypatch):
+    from config import settings
+    from app.api import workload
+
+    monkeypatch.setattr(settings, "WORKLOAD_CACHE_MAX_ENTRIES", 2)
+    workload._weekly_cache.clear()
+    semester = seed_template(db, days=7, groups=1, name="Семестр", is_full_semester=True)
+    semester.date_end = semester.date_start + timedelta(days=27)
+    db.commit()
+
+    for days in range(1, 5):
+        teacher_workload(db, semester.date_start, semester.date_start + timedelta(days=days * 7 - 1), period="month")
+
+    assert len(workload._weekly_cache) == 2
+    assert _lessons(teacher_workload(db, period="month")) == {"Преподаватель Семестр": 56}